@@ -0,0 +1,84 @@
+"""
+Latency of user cache lookups under concurrency, blocking vs async Redis.
+
+Each simulated request does what ``Auth.get_current_user`` does on a cache
+hit: fetch the user record from Redis and decode it. ``--concurrency``
+coroutines share one event loop, the way requests share a uvicorn worker.
+
+* ``sync``: a blocking ``redis.Redis`` client called from the coroutine, as
+  the auth cache did before.
+* ``async``: the ``redis.asyncio`` connection pool opened by ``main.lifespan``.
+
+Run from the project root against a Redis server::
+
+    python -m fastapi_project.benchmarks.auth_cache_load --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import redis
+import redis.asyncio as aredis
+from fastapi_project.src.database.models import User
+from fastapi_project.src.services.auth import serialize_user, deserialize_user
+
+KEY = "bench:deadpool@example.com"
+
+
+async def sync_lookup(client: redis.Redis):
+    return deserialize_user(client.get(KEY))
+
+
+async def async_lookup(client: aredis.Redis):
+    return deserialize_user(await client.get(KEY))
+
+
+async def run(lookup, client, concurrency: int, requests: int):
+    latencies = []
+
+    async def worker():
+        for _ in range(requests):
+            start = time.perf_counter()
+            # Yield once, as a request does while its other dependencies run.
+            await asyncio.sleep(0)
+            await lookup(client)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--requests", type=int, default=200, help="requests per coroutine")
+    args = parser.parse_args()
+
+    user = User(id=1, username="deadpool", email="deadpool@example.com", avatar=None, confirmed=True)
+    sync_client = redis.Redis.from_url(args.redis_url)
+    sync_client.set(KEY, serialize_user(user), ex=900)
+    pool = aredis.ConnectionPool.from_url(args.redis_url, max_connections=100)
+    async_client = aredis.Redis(connection_pool=pool)
+
+    print(f"{'mode':<7}{'conc':>6}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        for mode, lookup, client in (("sync", sync_lookup, sync_client), ("async", async_lookup, async_client)):
+            result = await run(lookup, client, concurrency, args.requests)
+            print(f"{mode:<7}{concurrency:>6}{result['rps']:>10.0f}{result['p50']:>9.2f}{result['p99']:>9.2f}")
+
+    sync_client.delete(KEY)
+    sync_client.close()
+    await async_client.aclose()
+    await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Avatars processed per second by the local image pipeline, in total and per core.
+
+Writes ``--images`` synthetic photos of ``--width`` x ``--height`` as JPEG and
+renders their ``AVATAR_SIZES`` variants with ``services.images.render_variants``:
+
+* ``1 process``: one after another in this process;
+* ``N processes``: through ``ImagePipeline`` with ``--workers`` processes.
+
+Requires Pillow. Run from the project root::
+
+    python -m fastapi_project.benchmarks.avatar_images --images 200 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image
+from fastapi_project.src.services.images import ImagePipeline, render_variants
+
+
+def photo(width: int, height: int, seed: int):
+    size = (width, height)
+    noise = Image.effect_noise(size, 30 + seed % 20)
+    return Image.merge("RGB", [
+        noise,
+        Image.linear_gradient("L").resize(size),
+        Image.radial_gradient("L").resize(size),
+    ])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 128, 64])
+    parser.add_argument("--format", choices=["webp", "jpeg"], default="webp")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        sources = []
+        for i in range(args.images):
+            path = directory / f"{i}.upload"
+            photo(args.width, args.height, i).save(path, "JPEG", quality=90)
+            sources.append(path)
+        pipeline = ImagePipeline(args.sizes, args.format, args.quality, workers=args.workers)
+        # Start the worker processes before timing.
+        await asyncio.gather(*(pipeline.render(path, directory) for path in sources[:args.workers]))
+
+        print(f"{'mode':<14}{'images/s':>10}{'per core':>10}")
+        start = time.perf_counter()
+        for path in sources:
+            render_variants(path, directory, pipeline.sizes, pipeline.fmt, pipeline.quality, pipeline.max_pixels)
+        elapsed = time.perf_counter() - start
+        print(f"{'1 process':<14}{args.images / elapsed:>10.1f}{args.images / elapsed:>10.1f}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(pipeline.render(path, directory) for path in sources))
+        elapsed = time.perf_counter() - start
+        rate = args.images / elapsed
+        print(f"{f'{args.workers} processes':<14}{rate:>10.1f}{rate / args.workers:>10.1f}")
+        pipeline.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+Email bodies rendered per second with each rendering strategy.
+
+* ``fastapi-mail``: a new ``Environment`` and template load per message, as
+  ``FastMail.send_message(..., template_name=...)`` did;
+* ``compiled``: ``TemplateService.render`` with the template compiled once;
+* ``prerendered``: ``TemplateService.render_fields``, which only joins the
+  static parts with the escaped per-user values.
+
+Run from the project root::
+
+    python -m fastapi_project.benchmarks.email_templates --number 20000
+"""
+import argparse
+import time
+from jinja2 import Environment, FileSystemLoader
+from fastapi_project.src.services.templating import TEMPLATE_DIR, TemplateService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--template", default="email_template.html")
+    args = parser.parse_args()
+
+    service = TemplateService(TEMPLATE_DIR)
+    service.preload()
+    values = [
+        {"host": "https://contacts.example.com/", "username": f"user{i}", "token": f"token-{i:08d}"}
+        for i in range(args.number)
+    ]
+    strategies = {
+        "fastapi-mail": lambda v: Environment(loader=FileSystemLoader(TEMPLATE_DIR)).get_template(args.template).render(**v),
+        "compiled": lambda v: service.render(args.template, **v),
+        "prerendered": lambda v: service.render_fields(args.template, **v),
+    }
+
+    print(f"{'strategy':<14}{'messages/s':>12}{'us/message':>12}")
+    for name, render in strategies.items():
+        count = args.number if name != "fastapi-mail" else max(args.number // 20, 1)
+        start = time.perf_counter()
+        for v in values[:count]:
+            render(v)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14}{count / elapsed:>12.0f}{elapsed / count * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
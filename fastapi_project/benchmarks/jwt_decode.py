@@ -0,0 +1,39 @@
+"""
+Cost of verifying an access token, uncached vs through ``Auth.decode_token``.
+
+``GET /api/contacts`` resolves the same token twice per request, once in the
+``RateLimiter`` identifier and once in ``get_current_user``. The per-request
+column shows that pair of lookups.
+
+Run from the project root::
+
+    python -m fastapi_project.benchmarks.jwt_decode
+"""
+import argparse
+import asyncio
+import timeit
+from jose import jwt
+from fastapi_project.src.services.auth import Auth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    auth = Auth()
+    token = asyncio.run(auth.create_access_token({"sub": "deadpool@example.com"}))
+    auth.decode_token(token)
+
+    cases = {
+        "jose jwt.decode": lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]),
+        "decode_token (hot)": lambda: auth.decode_token(token),
+    }
+    print(f"{'path':<20}{'us/decode':>11}{'us/request':>12}")
+    for name, decode in cases.items():
+        per_call = timeit.timeit(decode, number=args.number) / args.number * 1e6
+        print(f"{name:<20}{per_call:>11.2f}{per_call * 2:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Login throughput and event loop stalls with and without the password hashing executor.
+
+``--logins`` concurrent coroutines each verify a bcrypt password, as the
+``login`` handler does, while a ticker coroutine measures how late the event
+loop wakes it up (the delay every other in-flight request would see).
+
+* ``inline``: ``Auth.verify_password`` called directly in the coroutine.
+* ``executor``: ``Auth.verify_password_async`` in the bounded executor.
+
+Run from the project root::
+
+    python -m fastapi_project.benchmarks.password_hashing --logins 50
+"""
+import argparse
+import asyncio
+import time
+from fastapi_project.src.services.auth import Auth, PasswordHasher
+
+
+async def ticker(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(login, logins: int):
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return logins / elapsed, max(lags) * 1000 if lags else elapsed * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    auth = Auth()
+    auth.password_hasher = PasswordHasher(args.executor, args.workers, queue_size=args.logins)
+    hashed = auth.get_password_hash("12345678")
+
+    async def inline_login():
+        return auth.verify_password("12345678", hashed)
+
+    async def executor_login():
+        return await auth.verify_password_async("12345678", hashed)
+
+    print(f"{'mode':<10}{'logins/s':>10}{'max loop lag ms':>17}")
+    for mode, login in (("inline", inline_login), ("executor", executor_login)):
+        throughput, lag = await run(login, args.logins)
+        print(f"{mode:<10}{throughput:>10.1f}{lag:>17.1f}")
+    auth.password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Throughput of sending emails with a new SMTP session per message versus pooled sessions.
+
+Starts a local aiosmtpd server that accepts and discards mail, by default
+behind implicit TLS with a throwaway self-signed certificate, and sends
+``--messages`` emails twice with ``--concurrency`` senders:
+
+* ``per-message``: a new ``FastMail`` connection per email, as emails were sent before the pool;
+* ``pooled``: ``services.mail_transport.SMTPPool.send_many`` with ``--concurrency`` sessions.
+
+Requires ``aiosmtpd``. Run from the project root::
+
+    python -m fastapi_project.benchmarks.smtp_transport --messages 2000
+"""
+import argparse
+import asyncio
+import datetime
+import socket
+import ssl
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from fastapi_project.src.services.mail_transport import SMTPPool
+
+
+def self_signed_context(directory: Path):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.UTC)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = directory / "cert.pem", directory / "key.pem"
+    cert_file.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_file.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def per_message(conf: ConnectionConfig, count: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(i):
+        async with slots:
+            message = MessageSchema(subject="Confirm your email ", recipients=[f"user{i}@example.com"],
+                                    body="<p>Hello</p>", subtype=MessageType.html)
+            await FastMail(conf).send_message(message)
+
+    await asyncio.gather(*(send(i) for i in range(count)))
+    return {"connects": count}
+
+
+async def pooled(conf: ConnectionConfig, count: int, concurrency: int):
+    pool = SMTPPool(conf, size=concurrency)
+    messages = []
+    for i in range(count):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = conf.MAIL_FROM, f"user{i}@example.com", "Confirm your email "
+        message.set_content("<p>Hello</p>", subtype="html")
+        messages.append(message)
+    results = await pool.send_many(messages)
+    await pool.close()
+    assert not any(results), [error for error in results if error]
+    return pool.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--no-tls", dest="tls", action="store_false", help="plain SMTP instead of implicit TLS")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        context = self_signed_context(Path(directory)) if args.tls else None
+        controller = Controller(Sink(), hostname="127.0.0.1", port=free_port(), ssl_context=context)
+        controller.start()
+        conf = ConnectionConfig(
+            MAIL_USERNAME="sender@example.com", MAIL_PASSWORD="", MAIL_FROM="sender@example.com",
+            MAIL_PORT=controller.port, MAIL_SERVER="127.0.0.1", MAIL_FROM_NAME="Contacts", MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=args.tls, USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+        )
+        try:
+            print(f"{'mode':<14}{'messages/s':>12}{'connects':>10}")
+            for name, run in (("per-message", per_message), ("pooled", pooled)):
+                start = time.perf_counter()
+                stats = await run(conf, args.messages, args.concurrency)
+                elapsed = time.perf_counter() - start
+                print(f"{name:<14}{args.messages / elapsed:>12.0f}{stats['connects']:>10}")
+        finally:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Payload size and decode time of the cached user record.
+
+Compares the versioned JSON record of ``services.auth.serialize_user`` with
+the ``pickle.dumps(User)`` payload that was cached before. The user is loaded
+from an in-memory SQLite database, so the pickle carries the same ORM state as
+an instance returned by ``repository.users.get_user_by_email``.
+
+Run from the project root::
+
+    python -m fastapi_project.benchmarks.user_cache
+"""
+import argparse
+import asyncio
+import pickle
+import timeit
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi_project.src.database.models import Base, User
+from fastapi_project.src.repository.users import get_user_by_email
+from fastapi_project.src.services.auth import serialize_user, deserialize_user
+
+
+async def load_user():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        session.add(User(
+            username="deadpool",
+            email="deadpool@example.com",
+            password="$2b$12$" + "x" * 53,
+            avatar="https://www.gravatar.com/avatar/0123456789abcdef0123456789abcdef",
+            refresh_token="r" * 200,
+            confirmed=True,
+        ))
+        await session.commit()
+        user = await get_user_by_email("deadpool@example.com", session)
+    await engine.dispose()
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    user = asyncio.run(load_user())
+    payloads = {"pickle": pickle.dumps(user), "json v1": serialize_user(user)}
+    decoders = {"pickle": pickle.loads, "json v1": deserialize_user}
+
+    print(f"{'format':<10}{'bytes':>8}{'decode us':>12}")
+    for name, payload in payloads.items():
+        seconds = timeit.timeit(lambda: decoders[name](payload), number=args.number)
+        print(f"{name:<10}{len(payload):>8}{seconds / args.number * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_limiter import FastAPILimiter
-from fastapi_project.src.database.db import get_db
-from fastapi_project.src.routes import contacts, auth, users
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.database.db import get_db, replicas
+from fastapi_project.src.routes import contacts, auth, users, stats
+from fastapi_project.src.services.auth import auth_service
+from fastapi_project.src.services.avatars import avatar_uploader
+from fastapi_project.src.services.storage import ImmutableStaticFiles
+from fastapi_project.src.services.user_cache import user_cache
+from fastapi_project.src.services.response_cache import response_cache
+from fastapi_project.src.services.templating import template_service
 from contextlib import asynccontextmanager
 
 
@@ -14,15 +21,37 @@ async def lifespan(app: FastAPI):
     """
     Lifespan context for initializing and closing application-level resources.
 
-    This function sets up the Redis connection for FastAPI Limiter and closes it on shutdown.
+    This function compiles the templates, opens the Redis connection pool
+    shared by FastAPI Limiter, the user cache, the response cache and
+    read-replica routing, starts the replica health checks, resumes staged
+    avatar uploads, and closes all of it and the password hashing executor on
+    shutdown.
 
     :param app: The FastAPI application instance.
     :type app: FastAPI
     """
-    r = redis.Redis(host='localhost', port=6379, db=0, encoding="utf-8", decode_responses=True)
+    pool = redis.ConnectionPool(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+    )
+    r = redis.Redis(connection_pool=pool)
+    template_service.preload()
     await FastAPILimiter.init(r)
+    await user_cache.start(r)
+    response_cache.start(r)
+    await replicas.start(r)
+    avatar_uploader.start()
     yield
+    await avatar_uploader.stop()
+    await replicas.stop()
+    response_cache.stop()
+    await user_cache.stop()
     await r.aclose()
+    await pool.aclose()
+    auth_service.password_hasher.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -34,11 +63,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix='/api')
+if config.STATS_ENABLED:
+    app.include_router(stats.router, prefix='/api')
+if config.AVATAR_STORAGE == "local":
+    app.mount(config.AVATAR_LOCAL_URL, ImmutableStaticFiles(directory=config.AVATAR_LOCAL_DIR, check_dir=False),
+              name="avatars")
 
 @app.get("/")
 def index():
@@ -0,0 +1,36 @@
+"""add birthday_doy
+
+Revision ID: 3c1f7a9d2b64
+Revises: 9e45f45228d6
+Create Date: 2026-10-17 10:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9d2b64'
+down_revision: Union[str, None] = '9e45f45228d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('birthday_doy', sa.Integer(), nullable=True))
+    # Day of year in a leap-year calendar, so February 29 is always 60.
+    op.execute(
+        "UPDATE contacts SET birthday_doy = EXTRACT(DOY FROM make_date(2000, "
+        "EXTRACT(MONTH FROM birthday)::int, EXTRACT(DAY FROM birthday)::int))::int "
+        "WHERE birthday IS NOT NULL"
+    )
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
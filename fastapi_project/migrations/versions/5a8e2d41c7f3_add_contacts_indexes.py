@@ -0,0 +1,33 @@
+"""add contacts indexes
+
+Revision ID: 5a8e2d41c7f3
+Revises: 3c1f7a9d2b64
+Create Date: 2026-10-17 11:03:27.914562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8e2d41c7f3'
+down_revision: Union[str, None] = '3c1f7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_contacts_user_id_last_name_first_name', 'contacts',
+                    ['user_id', 'last_name', 'first_name', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_first_name', 'contacts', ['user_id', 'first_name'], unique=False)
+    op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_first_name', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_last_name_first_name', table_name='contacts')
@@ -0,0 +1,28 @@
+"""add contacts version
+
+Revision ID: 7d2b9c14e8a5
+Revises: 5a8e2d41c7f3
+Create Date: 2026-10-17 14:21:09.336817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2b9c14e8a5'
+down_revision: Union[str, None] = '5a8e2d41c7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('contacts', 'version')
@@ -0,0 +1,35 @@
+"""add id to contacts birthday index
+
+Revision ID: a9c4e7f2d815
+Revises: f3b9e6c1a4d8
+Create Date: 2026-10-17 21:14:52.307615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e7f2d815'
+down_revision: Union[str, None] = 'f3b9e6c1a4d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build the new index before dropping the old one, without blocking writes to contacts.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contacts_user_id_birthday_doy_id', 'contacts', ['user_id', 'birthday_doy', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'],
+                        unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_contacts_user_id_birthday_doy_id', table_name='contacts', postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""add contacts search indexes
+
+Revision ID: b41e6f0a9d27
+Revises: 7d2b9c14e8a5
+Create Date: 2026-10-17 15:02:44.180275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e6f0a9d27'
+down_revision: Union[str, None] = '7d2b9c14e8a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay identical to models.contact_search_text, or the planner will not use the indexes.
+SEARCH_TEXT = (
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') || ' ' "
+    "|| coalesce(phone_number, '') || ' ' || coalesce(add_info, '')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Build without blocking writes to contacts; CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contacts_search_vector', 'contacts', [sa.text(f"to_tsvector('simple', {SEARCH_TEXT})")],
+                        postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_contacts_search_trgm', 'contacts', [sa.text(f"({SEARCH_TEXT}) gin_trgm_ops")],
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contacts_search_trgm', table_name='contacts', postgresql_concurrently=True)
+        op.drop_index('ix_contacts_search_vector', table_name='contacts', postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""add contacts normalized columns
+
+Revision ID: c8f3a6d1e920
+Revises: b41e6f0a9d27
+Create Date: 2026-10-17 15:48:12.604931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f3a6d1e920'
+down_revision: Union[str, None] = 'b41e6f0a9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('email_normalized', sa.String(length=150), nullable=True))
+    op.add_column('contacts', sa.Column('phone_normalized', sa.String(length=30), nullable=True))
+    # Same rules as repository.contacts.normalize_email and normalize_phone.
+    op.execute(
+        "UPDATE contacts SET email_normalized = lower(btrim(email)), "
+        "phone_normalized = NULLIF('+' || CASE WHEN ltrim(phone_number) LIKE '00%' "
+        "THEN substr(regexp_replace(phone_number, '[^0-9]', '', 'g'), 3) "
+        "ELSE regexp_replace(phone_number, '[^0-9]', '', 'g') END, '+')"
+    )
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
+    op.create_index('ix_contacts_user_id_email_normalized', 'contacts', ['user_id', 'email_normalized'], unique=True)
+    op.create_index('ix_contacts_user_id_phone_normalized', 'contacts', ['user_id', 'phone_normalized'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_phone_normalized', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_email_normalized', table_name='contacts')
+    op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=False)
+    op.drop_column('contacts', 'phone_normalized')
+    op.drop_column('contacts', 'email_normalized')
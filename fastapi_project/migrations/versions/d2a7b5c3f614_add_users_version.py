@@ -0,0 +1,28 @@
+"""add users version
+
+Revision ID: d2a7b5c3f614
+Revises: c8f3a6d1e920
+Create Date: 2026-10-17 16:37:51.092846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7b5c3f614'
+down_revision: Union[str, None] = 'c8f3a6d1e920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'version')
@@ -0,0 +1,53 @@
+"""add contacts sync
+
+Revision ID: e5c1d8a2b703
+Revises: d2a7b5c3f614
+Create Date: 2026-10-17 17:25:36.417209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c1d8a2b703'
+down_revision: Union[str, None] = 'd2a7b5c3f614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.execute("UPDATE contacts SET updated_at = created_at WHERE created_at IS NOT NULL")
+    op.create_index('ix_contacts_user_id_updated_at', 'contacts', ['user_id', 'updated_at', 'id'], unique=False)
+    op.create_table('contact_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_tombstones_user_id_deleted_at', 'contact_tombstones',
+                    ['user_id', 'deleted_at', 'id'], unique=False)
+    op.execute(
+        "CREATE OR REPLACE FUNCTION contacts_tombstone() RETURNS trigger AS $$ BEGIN "
+        "INSERT INTO contact_tombstones (contact_id, user_id, deleted_at) VALUES (OLD.id, OLD.user_id, now()); "
+        "RETURN OLD; END $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER contacts_tombstone AFTER DELETE ON contacts "
+        "FOR EACH ROW EXECUTE FUNCTION contacts_tombstone()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER contacts_tombstone ON contacts")
+    op.execute("DROP FUNCTION contacts_tombstone()")
+    op.drop_index('ix_contact_tombstones_user_id_deleted_at', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_user_id_updated_at', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
@@ -0,0 +1,49 @@
+"""add email outbox
+
+Revision ID: f3b9e6c1a4d8
+Revises: e5c1d8a2b703
+Create Date: 2026-10-17 18:42:09.128374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9e6c1a4d8'
+down_revision: Union[str, None] = 'e5c1d8a2b703'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('email', sa.String(length=250), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=True),
+    sa.Column('host', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=10), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_user_id_kind_pending', 'email_outbox', ['user_id', 'kind'], unique=True,
+                    postgresql_where=sa.text("status = 'pending'"))
+    op.create_index('ix_email_outbox_next_attempt_at_pending', 'email_outbox', ['next_attempt_at', 'id'],
+                    unique=False, postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_outbox_next_attempt_at_pending', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_user_id_kind_pending', table_name='email_outbox')
+    op.drop_table('email_outbox')
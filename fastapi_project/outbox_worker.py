@@ -0,0 +1,61 @@
+"""
+Email outbox worker.
+
+Sends the emails that the API queues in the ``email_outbox`` table. Run any
+number of workers next to the API, from the project root::
+
+    python -m fastapi_project.outbox_worker
+
+SIGINT and SIGTERM stop the worker after the current round.
+"""
+import asyncio
+import logging
+import signal
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.database.db import SessionLocal, engine
+from fastapi_project.src.database.models import EmailOutbox
+from fastapi_project.src.services.email import deliver, mail_transport
+from fastapi_project.src.services.outbox import OutboxWorker
+from fastapi_project.src.services.templating import template_service
+
+
+async def send(email: EmailOutbox):
+    """
+    Send a queued email over the pooled SMTP sessions of ``services.email.mail_transport``.
+
+    :param email: The queued email.
+    :type email: EmailOutbox
+    """
+    await deliver(email.kind, email.email, email.username, email.host)
+
+
+async def main():
+    """
+    Run an outbox worker until the process is asked to stop.
+    """
+    template_service.preload()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    worker = OutboxWorker(
+        SessionLocal,
+        send,
+        concurrency=config.OUTBOX_CONCURRENCY,
+        max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+        backoff_base=config.OUTBOX_BACKOFF_BASE,
+        backoff_max=config.OUTBOX_BACKOFF_MAX,
+        lease_seconds=config.OUTBOX_LEASE_SECONDS,
+        poll_interval=config.OUTBOX_POLL_INTERVAL,
+    )
+    try:
+        await worker.run(stop)
+    finally:
+        await mail_transport.close()
+        await engine.dispose()
+        logging.getLogger(__name__).info("Outbox worker stopped: %s, SMTP: %s", worker.stats(), mail_transport.stats())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -1,5 +1,5 @@
-from typing import Any
-from pydantic import ConfigDict, field_validator, EmailStr
+from typing import Any, Literal
+from pydantic import ConfigDict, field_validator, model_validator, EmailStr
 from pydantic_settings import BaseSettings
 from pathlib import Path
 import os
@@ -19,24 +19,74 @@ class Settings(BaseSettings):
     """
     Application settings loaded from environment variables.
 
-    These settings configure database, JWT, email, Redis, and Cloudinary services.
+    These settings configure database, JWT, email, Redis, and avatar storage services.
     Environment variables are read from a `.env` file.
     """
     DB_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_connections"] = "round_robin"
+    DB_REPLICA_HEALTH_INTERVAL: float = 5
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2
+    DB_REPLICA_STICKY_SECONDS: float = 5
     SECRET_KEY_JWT: str
     ALGORITHM: str
+    JWT_CACHE_SIZE: int = 4096
+    JWT_CACHE_TTL: float = 900
     MAIL_USERNAME: EmailStr
     MAIL_PASSWORD: str
     MAIL_FROM: str
     MAIL_PORT: int
     MAIL_SERVER: str
     MAIL_FROM_NAME:str
+    MAIL_STARTTLS: bool = False
+    MAIL_SSL_TLS: bool = True
+    MAIL_USE_CREDENTIALS: bool = True
+    MAIL_VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: int = 4
+    MAIL_SESSION_MAX_MESSAGES: int = 100
+    MAIL_IDLE_TIMEOUT: float = 30
+    TEMPLATE_BYTECODE_CACHE_DIR: str | None = None
+    OUTBOX_CONCURRENCY: int = 10
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_BACKOFF_BASE: float = 30
+    OUTBOX_BACKOFF_MAX: float = 3600
+    OUTBOX_LEASE_SECONDS: float = 300
+    OUTBOX_POLL_INTERVAL: float = 1
     REDIS_DOMAIN: str
     REDIS_PORT: int
     REDIS_PASSWORD: str | None = None
+    REDIS_MAX_CONNECTIONS: int = 100
+    USER_CACHE_TTL: int = 900
+    USER_CACHE_LOCAL_SIZE: int = 1024
+    USER_CACHE_LOCAL_TTL: float = 5
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    IMPORT_CHUNK_SIZE: int = 1000
+    SYNC_SETTLE_SECONDS: float = 2
+    RESPONSE_CACHE_ROUTES: dict[str, int] = {"contacts": 30, "birthday": 300}
+    STATS_ENABLED: bool = False
     CLOUDINARY_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    AVATAR_STORAGE: Literal["cloudinary", "local"] = "cloudinary"
+    AVATAR_LOCAL_DIR: str = "media/avatars"
+    AVATAR_LOCAL_URL: str = "/media/avatars"
+    AVATAR_STAGING_DIR: str = "media/staging"
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_UPLOAD_WORKERS: int = 4
+    AVATAR_PROCESSING: Literal["cloudinary", "local"] = "cloudinary"
+    AVATAR_SIZES: list[int] = [250, 128, 64]
+    AVATAR_FORMAT: Literal["webp", "jpeg"] = "webp"
+    AVATAR_QUALITY: int = 80
+    AVATAR_MAX_PIXELS: int = 25_000_000
+    AVATAR_PROCESS_WORKERS: int = 2
 
     @field_validator("ALGORITHM")
     @classmethod
@@ -54,6 +104,22 @@ class Settings(BaseSettings):
             raise ValueError("algorithm must be HS256 or HS512")
         return v
 
+    @model_validator(mode="after")
+    def validate_avatar_processing(self):
+        """
+        Require the local image pipeline with local avatar storage.
+
+        Only Cloudinary resizes avatars on delivery; local storage would serve
+        the raw, unchecked upload.
+
+        :raises ValueError: If ``AVATAR_STORAGE`` is local and ``AVATAR_PROCESSING`` is not.
+        :return: Validated settings.
+        :rtype: Settings
+        """
+        if self.AVATAR_STORAGE == "local" and self.AVATAR_PROCESSING != "local":
+            raise ValueError("AVATAR_STORAGE=local requires AVATAR_PROCESSING=local")
+        return self
+
 
     model_config = ConfigDict(extra='ignore', env_file=ENV_PATH, env_file_encoding="utf-8")  # noqa
 
@@ -1,11 +1,32 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from fastapi_project.src.conf.config import config
+from fastapi_project.src.database.pool import PoolMonitor, engine_options
+from fastapi_project.src.database.replicas import Replica, ReplicaSet
 
-engine = create_async_engine(config.DB_URL)
+pool_monitor = PoolMonitor(config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW)
+engine = create_async_engine(config.DB_URL, **engine_options(config.DB_URL, config, pool_monitor))
+pool_monitor.attach(engine)
 
 SessionLocal = async_sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+replicas = ReplicaSet(
+    SessionLocal,
+    [Replica(url, config) for url in config.DB_REPLICA_URLS],
+    config.DB_REPLICA_SELECTION,
+    config.DB_REPLICA_HEALTH_INTERVAL,
+    config.DB_REPLICA_HEALTH_TIMEOUT,
+    config.DB_REPLICA_STICKY_SECONDS,
+)
+
 async def get_db():
 
     async with SessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def get_session_maker():
+    """
+    Provide the session factory for work that outlives the request's ``get_db`` session,
+    such as streaming response bodies.
+    """
+    return SessionLocal
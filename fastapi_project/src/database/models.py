@@ -1,22 +1,131 @@
-from sqlalchemy import Column, Integer, String, Date, func, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, func, ForeignKey, Boolean, Index, DDL, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import DateTime
+from sqlalchemy.dialects import sqlite
+# Registers the typed to_tsvector() used by the search expressions below.
+import sqlalchemy.dialects.postgresql  # noqa: F401
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql.functions import GenericFunction
 
 Base = declarative_base()
 
+# Change timestamps are compared in sync queries. SQLite stores func.now() as
+# CURRENT_TIMESTAMP text, so bind parameters must use the same text format.
+ChangeTimestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    'sqlite',
+)
+
+
+class change_now(GenericFunction):
+    """
+    Current database time as a naive timestamp, comparable with change timestamps.
+
+    ``now()`` is a ``timestamptz`` on PostgreSQL, which asyncpg cannot bind
+    against the ``timestamp without time zone`` change columns.
+    """
+    type = ChangeTimestamp
+    inherit_cache = True
+
+
+@compiles(change_now)
+def _compile_change_now(element, compiler, **kw):
+    return "LOCALTIMESTAMP"
+
+
+@compiles(change_now, 'sqlite')
+def _compile_change_now_sqlite(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
 class Contact(Base):
     __tablename__ = "contacts"
     id = Column(Integer, primary_key=True)
     first_name = Column(String(150), nullable=False)
     last_name = Column(String(150), nullable=False)
     email = Column(String(150), unique=True, nullable=False)
+    email_normalized = Column(String(150))
     phone_number = Column(String(30), unique=True)
+    phone_normalized = Column(String(30))
     birthday = Column(Date)
+    birthday_doy = Column(Integer)
     created_at = Column('created_at', DateTime, default=func.now())
+    updated_at = Column(ChangeTimestamp, nullable=False, default=func.now(), onupdate=func.now(),
+                        server_default=func.now())
     add_info = Column(String)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="contacts")
+    __table_args__ = (
+        Index('ix_contacts_user_id_birthday_doy_id', 'user_id', 'birthday_doy', 'id'),
+        Index('ix_contacts_user_id_last_name_first_name', 'user_id', 'last_name', 'first_name', 'id'),
+        Index('ix_contacts_user_id_first_name', 'user_id', 'first_name'),
+        Index('ix_contacts_user_id_email_normalized', 'user_id', 'email_normalized', unique=True),
+        Index('ix_contacts_user_id_phone_normalized', 'user_id', 'phone_normalized', unique=True),
+        Index('ix_contacts_user_id_updated_at', 'user_id', 'updated_at', 'id'),
+    )
+
+
+class ContactTombstone(Base):
+    """
+    Record of a deleted contact, written by a database trigger on ``contacts``.
+
+    ``user_id`` has no foreign key so that tombstones can be written while a
+    user's contacts are removed by cascade.
+    """
+    __tablename__ = "contact_tombstones"
+    id = Column(Integer, primary_key=True)
+    contact_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    deleted_at = Column(ChangeTimestamp, nullable=False, default=func.now(), server_default=func.now())
+    __table_args__ = (
+        Index('ix_contact_tombstones_user_id_deleted_at', 'user_id', 'deleted_at', 'id'),
+    )
+
+# Search document of a contact. Literals are inlined so that queries match the
+# expression indexes below; coalesce and || keep the expression immutable.
+CONTACT_SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'phone_number', 'add_info')
+contact_search_text = func.coalesce(Contact.__table__.c.first_name, text("''"))
+for _name in CONTACT_SEARCH_COLUMNS[1:]:
+    contact_search_text = contact_search_text.op('||')(text("' '")).op('||')(
+        func.coalesce(Contact.__table__.c[_name], text("''"))
+    )
+contact_search_vector = func.to_tsvector(text("'simple'"), contact_search_text)
+
+Index('ix_contacts_search_vector', contact_search_vector, postgresql_using='gin').ddl_if(dialect='postgresql')
+Index('ix_contacts_search_trgm', contact_search_text.label('search_text'), postgresql_using='gin',
+      postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+# SQLite has no tsvector or pg_trgm: search there goes through an FTS5 index kept in sync by triggers.
+_fts_columns = ', '.join(CONTACT_SEARCH_COLUMNS)
+_fts_new = ', '.join(f'new.{name}' for name in CONTACT_SEARCH_COLUMNS)
+_fts_old = ', '.join(f'old.{name}' for name in CONTACT_SEARCH_COLUMNS)
+for _ddl in (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5({_fts_columns}, content='contacts', content_rowid='id')",
+    f"CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+    f"CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old}); END",
+    f"CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old}); "
+    f"INSERT INTO contacts_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new}); END",
+):
+    event.listen(Contact.__table__, 'after_create', DDL(_ddl).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+
+# Deleting a contact, directly or by cascade, leaves a tombstone for incremental sync.
+event.listen(Contact.__table__, 'after_create', DDL(
+    "CREATE TRIGGER contacts_tombstone AFTER DELETE ON contacts BEGIN "
+    "INSERT INTO contact_tombstones (contact_id, user_id, deleted_at) VALUES (old.id, old.user_id, CURRENT_TIMESTAMP); END"
+).execute_if(dialect='sqlite'))
+for _ddl in (
+    "CREATE OR REPLACE FUNCTION contacts_tombstone() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO contact_tombstones (contact_id, user_id, deleted_at) VALUES (OLD.id, OLD.user_id, now()); "
+    "RETURN OLD; END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER contacts_tombstone AFTER DELETE ON contacts FOR EACH ROW EXECUTE FUNCTION contacts_tombstone()",
+):
+    event.listen(Contact.__table__, 'after_create', DDL(_ddl).execute_if(dialect='postgresql'))
 
 class User(Base):
     __tablename__ = "users"
@@ -28,3 +137,34 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
     confirmed= Column(Boolean(), default=False, nullable=True)
+    # Version of the public profile (UserResponse fields), used as the /users/me ETag.
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+
+
+class EmailOutbox(Base):
+    """
+    Email queued for the outbox worker.
+
+    A message stays ``pending`` until it is sent or runs out of attempts. At
+    most one pending message exists per user and kind. ``next_attempt_at`` is
+    pushed forward while a worker holds the message and after each failure.
+    """
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = Column(String(20), nullable=False)
+    email = Column(String(250), nullable=False)
+    username = Column(String(50))
+    host = Column(String(255), nullable=False)
+    status = Column(String(10), nullable=False, default='pending', server_default='pending')
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
+    __table_args__ = (
+        Index('ix_email_outbox_user_id_kind_pending', 'user_id', 'kind', unique=True,
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index('ix_email_outbox_next_attempt_at_pending', 'next_attempt_at', 'id',
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+    )
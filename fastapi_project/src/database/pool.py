@@ -0,0 +1,136 @@
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMonitor:
+    """
+    Connection pool counters collected from SQLAlchemy pool events.
+
+    Checkouts, checkins, new connections, invalidations and overflow use are
+    counted by event listeners. The time spent waiting for a connection and
+    pool timeouts are measured by the pool class from ``pool_class``, because
+    there is no pool event for the start of a checkout.
+    """
+
+    def __init__(self, pool_size: int, max_overflow: int):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.pool_class = self._make_pool_class()
+
+    def _make_pool_class(self):
+        monitor = self
+
+        class InstrumentedPool(AsyncAdaptedQueuePool):
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    return super().connect()
+                except exc.TimeoutError:
+                    monitor.timeouts += 1
+                    raise
+                finally:
+                    monitor.record_wait(time.perf_counter() - start)
+
+        return InstrumentedPool
+
+    def record_wait(self, seconds: float):
+        """
+        Record how long a checkout waited for a connection.
+
+        :param seconds: Wait time in seconds.
+        :type seconds: float
+        """
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def attach(self, engine: AsyncEngine):
+        """
+        Listen to the pool events of an engine.
+
+        :param engine: Engine whose pool should be monitored.
+        :type engine: AsyncEngine
+        """
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+        if self.checked_out > self.pool_size:
+            self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out -= 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def stats(self):
+        """
+        :return: Current use, saturation and cumulative counters of the pool.
+        :rtype: dict
+        """
+        capacity = self.pool_size + max(self.max_overflow, 0)
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "saturation": self.checked_out / capacity if capacity else 0.0,
+            "checkouts": self.checkouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_ms_max": self.wait_max * 1000,
+        }
+
+
+def engine_options(url: str, settings, monitor: PoolMonitor):
+    """
+    Build ``create_async_engine`` keyword arguments from the pool settings.
+
+    Pool sizing applies to server databases only; the asyncpg prepared
+    statement cache size only to asyncpg URLs.
+
+    :param url: Database URL.
+    :type url: str
+    :param settings: Application settings with the ``DB_POOL_*`` values.
+    :type settings: Settings
+    :param monitor: Monitor whose pool class and limits are used.
+    :type monitor: PoolMonitor
+    :return: Engine keyword arguments.
+    :rtype: dict
+    """
+    url = make_url(url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING, "pool_recycle": settings.DB_POOL_RECYCLE}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=monitor.pool_class,
+            pool_size=monitor.pool_size,
+            max_overflow=monitor.max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
@@ -0,0 +1,182 @@
+import asyncio
+from typing import Literal
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi_project.src.database.pool import PoolMonitor, engine_options
+from fastapi_project.src.services.cache import LRUCache
+
+STICKY_KEY = "db:primary:{key}"
+STICKY_LOCAL_SIZE = 10000
+
+
+class Replica:
+    """
+    A read replica with its own engine, session factory and pool monitor.
+    """
+
+    def __init__(self, url: str, settings):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.monitor = PoolMonitor(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+        self.engine = create_async_engine(url, **engine_options(url, settings, self.monitor))
+        self.monitor.attach(self.engine)
+        self.session_maker = async_sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+        self.healthy = True
+        self.failed_checks = 0
+        self.reads = 0
+
+    async def ping(self):
+        """
+        Run ``SELECT 1`` on a fresh checkout from the replica's pool.
+        """
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+class ReplicaSet:
+    """
+    Routes read-only sessions to healthy read replicas.
+
+    Replicas are chosen round-robin or by the fewest checked-out connections
+    and are taken out of rotation while their health check fails. Without
+    replicas, with none healthy, or for a key written to within the last
+    ``sticky_seconds`` (read-your-writes), the primary session factory is used.
+    Recent writes are remembered in-process and, with a Redis client, across
+    workers.
+    """
+
+    def __init__(self, primary: async_sessionmaker, replicas: list[Replica],
+                 selection: Literal["round_robin", "least_connections"] = "round_robin",
+                 health_interval: float = 5, health_timeout: float = 2, sticky_seconds: float = 5):
+        self.primary = primary
+        self.replicas = replicas
+        self.selection = selection
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.sticky_seconds = sticky_seconds
+        self.recent_writes = LRUCache(STICKY_LOCAL_SIZE, sticky_seconds)
+        self.client: redis.Redis | None = None
+        self.primary_reads = 0
+        self._next = 0
+        self._checker: asyncio.Task | None = None
+
+    async def start(self, client: redis.Redis | None = None):
+        """
+        Check every replica once, then keep checking them in the background.
+
+        :param client: Async Redis client used to share recent writes between workers.
+        :type client: redis.Redis, optional
+        """
+        self.client = client
+        if self.replicas:
+            await self.check()
+            self._checker = asyncio.create_task(self._check_forever())
+
+    async def stop(self):
+        """
+        Stop the health checks, detach the Redis client and close the replica engines.
+        """
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+        self.client = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _check_forever(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check()
+
+    async def _check(self, replica: Replica):
+        try:
+            await asyncio.wait_for(replica.ping(), self.health_timeout)
+        except Exception:
+            replica.healthy = False
+            replica.failed_checks += 1
+        else:
+            replica.healthy = True
+
+    async def check(self):
+        """
+        Ping all replicas concurrently and update their health.
+        """
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    def choose(self):
+        """
+        Pick a healthy replica.
+
+        :return: The selected replica, or None if no replica is healthy.
+        :rtype: Replica or None
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        self._next += 1
+        rotated = healthy[self._next % len(healthy):] + healthy[:self._next % len(healthy)]
+        if self.selection == "least_connections":
+            return min(rotated, key=lambda replica: replica.monitor.checked_out)
+        return rotated[0]
+
+    async def mark_write(self, key: str):
+        """
+        Route reads for ``key`` to the primary for the next ``sticky_seconds``.
+
+        :param key: Key of the writer, e.g. the user's email.
+        :type key: str
+        """
+        if not self.replicas:
+            return
+        self.recent_writes.set(key, True)
+        if self.client is not None:
+            await self.client.set(STICKY_KEY.format(key=key), 1, px=int(self.sticky_seconds * 1000))
+
+    async def wrote_recently(self, key: str):
+        """
+        :param key: Key of the writer.
+        :type key: str
+        :return: True if ``key`` was passed to ``mark_write`` within ``sticky_seconds``.
+        :rtype: bool
+        """
+        if self.recent_writes.get(key):
+            return True
+        return self.client is not None and bool(await self.client.exists(STICKY_KEY.format(key=key)))
+
+    async def session_maker(self, key: str | None = None):
+        """
+        Return the session factory for a read-only unit of work.
+
+        :param key: Key of the reader whose own writes must be visible, e.g. the user's email.
+        :type key: str, optional
+        :return: Session factory of a replica, or of the primary.
+        :rtype: async_sessionmaker
+        """
+        if not self.replicas:
+            return self.primary
+        replica = None if key is not None and await self.wrote_recently(key) else self.choose()
+        if replica is None:
+            self.primary_reads += 1
+            return self.primary
+        replica.reads += 1
+        return replica.session_maker
+
+    def stats(self):
+        """
+        :return: Health, read count and pool counters of every replica, and reads sent to the primary.
+        :rtype: dict
+        """
+        return {
+            "selection": self.selection,
+            "primary_reads": self.primary_reads,
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "failed_checks": replica.failed_checks,
+                 "reads": replica.reads, "pool": replica.monitor.stats()}
+                for replica in self.replicas
+            ],
+        }
@@ -1,14 +1,63 @@
-from sqlalchemy import select
-from sqlalchemy import and_
+import re
+from sqlalchemy import select, insert, update, delete, tuple_, func, table, column, literal_column, text
+from sqlalchemy import and_, or_, union_all
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
-from fastapi_project.src.database.models import Contact, User
-from fastapi_project.src.schemas import ContactSchema
+from sqlalchemy.orm import aliased
+from calendar import isleap
+from datetime import date, datetime, timedelta
+from fastapi_project.src.database.db import replicas
+from fastapi_project.src.database.models import (
+    Contact, ContactTombstone, User, change_now, contact_search_text, contact_search_vector,
+)
+from fastapi_project.src.schemas import ContactSchema, ContactUpdateSchema
+from fastapi_project.src.services.response_cache import response_cache
 
-async def get_contacts(limit: int, offset: int, use_get_filters: dict, db: AsyncSession, user: User):
+def contact_sort_key(contact: Contact):
+    """
+    Return the position of a contact in the ``get_contacts`` order.
+
+    :param contact: Contact object.
+    :type contact: Contact
+    :return: Last name, first name and ID of the contact.
+    :rtype: tuple[str, str, int]
+    """
+    return contact.last_name, contact.first_name, contact.id
+
+
+def filter_criteria(use_get_filters: dict):
+    """
+    Build exact-match criteria from query filters.
+
+    Email and phone number are compared on their normalized columns, so
+    formatting and case variants match through the per-user indexes.
+
+    :param use_get_filters: Dictionary of filters where keys are Contact model field names and values are expected values.
+    :type use_get_filters: dict
+    :return: SQL criteria.
+    :rtype: list
+    """
+    criteria = []
+    for name, value in use_get_filters.items():
+        if name == "email":
+            criteria.append(Contact.email_normalized == normalize_email(value))
+        elif name == "phone_number":
+            criteria.append(Contact.phone_normalized == normalize_phone(value))
+        else:
+            criteria.append(getattr(Contact, name) == value)
+    return criteria
+
+
+async def get_contacts(limit: int, offset: int, use_get_filters: dict, db: AsyncSession, user: User,
+                       after: tuple | None = None):
     """
     Retrieve a list of contacts filtered by parameters and scoped to the given user.
 
+    Contacts are ordered by last name, first name and ID, which is the order of
+    the ``(user_id, last_name, first_name, id)`` index. When ``after`` is given,
+    the query seeks past that sort key instead of walking skipped rows.
+
     :param limit: Maximum number of contacts to return.
     :type limit: int
     :param offset: Number of contacts to skip (for pagination).
@@ -19,18 +68,233 @@ async def get_contacts(limit: int, offset: int, use_get_filters: dict, db: Async
     :type db: AsyncSession
     :param user: The user whose contacts should be retrieved.
     :type user: User
+    :param after: Sort key from ``contact_sort_key`` of the last contact of the previous page.
+    :type after: tuple or None
     :return: List of Contact objects matching the filters.
     :rtype: list[Contact]
     """
-    filters_list=[getattr(Contact,k)==v for k,v in use_get_filters.items()]
-    stmt = select(Contact).filter(and_(*filters_list, Contact.user_id == user.id )).offset(offset).limit(limit)
+    filters_list = filter_criteria(use_get_filters)
+    if after is not None:
+        filters_list.append(tuple_(Contact.last_name, Contact.first_name, Contact.id) > tuple_(*after))
+    stmt = (
+        select(Contact)
+        .filter(and_(*filters_list, Contact.user_id == user.id))
+        .order_by(Contact.last_name, Contact.first_name, Contact.id)
+        .offset(offset)
+        .limit(limit)
+    )
     contacts = await db.execute(stmt)
     return contacts.scalars().all()
 
-async def get_birthdays_contacts(limit: int, offset: int, days: int, db: AsyncSession, user: User):
+contacts_fts = table("contacts_fts", column("rowid"), column("rank"))
+
+
+def search_terms(q: str):
+    """
+    Split a search string into lowercase word terms.
+
+    :param q: Search string as typed by the user.
+    :type q: str
+    :return: Word terms; punctuation and operators are dropped.
+    :rtype: list[str]
+    """
+    return re.findall(r"\w+", q.lower())
+
+
+async def search_contacts(q: str, limit: int, offset: int, use_get_filters: dict, db: AsyncSession, user: User):
+    """
+    Search the user's contacts by names, email, phone number and additional info.
+
+    Every term of ``q`` must match the start of a word. On PostgreSQL the query
+    uses the ``to_tsvector`` GIN index and also matches ``q`` as a substring
+    through the ``pg_trgm`` index; on SQLite it uses the ``contacts_fts`` FTS5
+    table. Results are ranked and paginated by the database.
+
+    :param q: Search string.
+    :type q: str
+    :param limit: Maximum number of contacts to return.
+    :type limit: int
+    :param offset: Number of contacts to skip (for pagination).
+    :type offset: int
+    :param use_get_filters: Dictionary of exact-match filters, as in ``get_contacts``.
+    :type use_get_filters: dict
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user whose contacts should be searched.
+    :type user: User
+    :return: Matching contacts, best match first.
+    :rtype: list[Contact]
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+    filters_list = filter_criteria(use_get_filters)
+    if db.bind.dialect.name == "postgresql":
+        query = func.to_tsquery(text("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", q.strip()) + "%"
+        stmt = (
+            select(Contact)
+            .filter(and_(*filters_list, Contact.user_id == user.id,
+                         or_(contact_search_vector.op("@@")(query), contact_search_text.ilike(pattern))))
+            .order_by((func.ts_rank(contact_search_vector, query)
+                       + func.similarity(contact_search_text, q.strip())).desc(), Contact.id)
+        )
+    else:
+        match = " ".join('"' + term + '"*' for term in terms)
+        stmt = (
+            select(Contact)
+            .join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+            .filter(and_(*filters_list, Contact.user_id == user.id,
+                         literal_column("contacts_fts").op("MATCH")(match)))
+            .order_by(contacts_fts.c.rank, Contact.id)
+        )
+    contacts = await db.execute(stmt.offset(offset).limit(limit))
+    return contacts.scalars().all()
+
+
+def birthday_doy(birthday: date | None):
+    """
+    Convert a birthday into its day-of-year ordinal in a leap-year calendar.
+
+    The ordinal does not depend on the birth year, so February 29 is always 60
+    and March 1 is always 61.
+
+    :param birthday: Birthday date or None.
+    :type birthday: date or None
+    :return: Ordinal from 1 to 366, or None if there is no birthday.
+    :rtype: int or None
+    """
+    if birthday is None:
+        return None
+    return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
+
+def normalize_email(email: str | None):
+    """
+    Normalize an email address for lookups and duplicate checks.
+
+    :param email: Email address as entered.
+    :type email: str or None
+    :return: Lower-cased address without surrounding whitespace, or None.
+    :rtype: str or None
+    """
+    if email is None:
+        return None
+    return email.strip().lower()
+
+
+def normalize_phone(phone_number: str | None):
+    """
+    Normalize a phone number to E.164 form for lookups and duplicate checks.
+
+    Formatting is dropped and an ``00`` international prefix is replaced with
+    ``+``, so ``+1 (555) 010-0100`` and ``1555 0100100`` are the same number.
+    No country code is inferred for national numbers.
+
+    :param phone_number: Phone number as entered.
+    :type phone_number: str or None
+    :return: ``+`` followed by the digits, or None if there are no digits.
+    :rtype: str or None
+    """
+    if phone_number is None:
+        return None
+    digits = re.sub(r"[^0-9]", "", phone_number)
+    if phone_number.strip().startswith("00"):
+        digits = digits[2:]
+    return "+" + digits if digits else None
+
+
+def derived_values(values: dict):
+    """
+    Compute the derived columns of a contact from the written fields.
+
+    Only columns whose source field is present in ``values`` are returned, so
+    partial updates leave the others untouched.
+
+    :param values: Contact fields being written.
+    :type values: dict
+    :return: Values of ``birthday_doy``, ``email_normalized`` and ``phone_normalized``.
+    :rtype: dict
+    """
+    derived = {}
+    if "birthday" in values:
+        derived["birthday_doy"] = birthday_doy(values["birthday"])
+    if "email" in values:
+        derived["email_normalized"] = normalize_email(values["email"])
+    if "phone_number" in values:
+        derived["phone_normalized"] = normalize_phone(values["phone_number"])
+    return derived
+
+
+def _birthday_window(today: date, days: int):
+    """
+    Compute the ``birthday_doy`` bounds of an upcoming birthday window.
+
+    The window may wrap over New Year (``start > end``). February 29 birthdays
+    are celebrated on February 28 when the February inside the window is not in
+    a leap year, so a window ending on that day is extended over ordinal 60.
+
+    :param today: First day of the window.
+    :type today: date
+    :param days: Range in days to look ahead.
+    :type days: int
+    :return: Start and end ordinals, end is None when the window covers the whole year.
+    :rtype: tuple[int, int | None]
+    """
+    start = birthday_doy(today)
+    if days >= 365:
+        return start, None
+    end_date = today + timedelta(days=days)
+    end = birthday_doy(end_date)
+    if end == 59 and not isleap(end_date.year):
+        end = 60
+    return start, end
+
+
+def birthday_sort_key(contact: Contact):
+    """
+    Return the position of a contact in the ``get_birthdays_contacts`` order.
+
+    :param contact: Contact object.
+    :type contact: Contact
+    :return: Birthday ordinal and ID of the contact.
+    :rtype: tuple[int, int]
+    """
+    return contact.birthday_doy, contact.id
+
+
+async def stream_contacts(db: AsyncSession, user: User, batch_size: int = 1000):
+    """
+    Stream all contacts of a user ordered by ID through a server-side cursor.
+
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user whose contacts should be streamed.
+    :type user: User
+    :param batch_size: Number of rows fetched from the cursor at a time.
+    :type batch_size: int
+    :return: Async iterator of Contact objects.
+    :rtype: AsyncScalarResult
+    """
+    stmt = (
+        select(Contact)
+        .filter(Contact.user_id == user.id)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    return await db.stream_scalars(stmt)
+
+
+async def get_birthdays_contacts(limit: int, offset: int, days: int, db: AsyncSession, user: User,
+                                 after: tuple | None = None):
     """
     Retrieve contacts whose birthdays fall within the given number of days from today.
 
+    The lookup is a range scan over the ``(user_id, birthday_doy, id)`` index,
+    split into two ranges when the window crosses New Year; each range is read
+    in index order and the two are concatenated. When ``after`` is given, the
+    query seeks past that sort key in its range instead of walking skipped rows.
+
     :param limit: Maximum number of contacts to return.
     :type limit: int
     :param offset: Number of contacts to skip (for pagination).
@@ -41,21 +305,102 @@ async def get_birthdays_contacts(limit: int, offset: int, days: int, db: AsyncSe
     :type db: AsyncSession
     :param user: The user whose contacts should be checked.
     :type user: User
+    :param after: Sort key from ``birthday_sort_key`` of the last contact of the previous page.
+    :type after: tuple or None
     :return: List of Contact objects with upcoming birthdays.
     :rtype: list[Contact]
     """
-    stmt=select(Contact).filter(Contact.user_id == user.id)
+    start, end = _birthday_window(date.today(), days)
+    if end is None:
+        segments = [Contact.birthday_doy >= start, Contact.birthday_doy < start]
+    elif start <= end:
+        segments = [Contact.birthday_doy.between(start, end)]
+    else:
+        segments = [Contact.birthday_doy >= start, Contact.birthday_doy <= end]
+    # Segments before the one holding ``after`` were read by earlier pages.
+    after_segment = 1 if after is not None and len(segments) == 2 and after[0] < start else 0
+    parts = []
+    for segment in segments[after_segment:]:
+        filters_list = [Contact.user_id == user.id, segment]
+        if after is not None and not parts:
+            filters_list.append(tuple_(Contact.birthday_doy, Contact.id) > tuple_(*after))
+        parts.append(select(Contact).filter(and_(*filters_list)).order_by(Contact.birthday_doy, Contact.id))
+    if len(parts) == 1:
+        stmt = parts[0].offset(offset).limit(limit)
+    else:
+        # Each segment is an ordered range scan of at most offset + limit rows; only those are merged.
+        merged = union_all(*(
+            select(part.add_columns(literal_column(str(i)).label("segment")).limit(offset + limit).subquery())
+            for i, part in enumerate(parts)
+        )).subquery()
+        contact = aliased(Contact, merged)
+        stmt = (
+            select(contact)
+            .order_by(merged.c.segment, merged.c.birthday_doy, merged.c.id)
+            .offset(offset)
+            .limit(limit)
+        )
     contacts = await db.execute(stmt)
-    today = date.today()
-    upcoming_birthdays_list = []
-    for contact in contacts.scalars().all():
-        if contact.birthday:
-            birthday_this_year = contact.birthday.replace(year=today.year)
-            if birthday_this_year < today:
-                birthday_this_year = birthday_this_year.replace(year=today.year + 1)
-            if 0 <= (birthday_this_year - today).days <= days:
-                upcoming_birthdays_list.append(contact)
-    return upcoming_birthdays_list[offset:offset+limit]
+    return contacts.scalars().all()
+
+
+async def get_sync_watermark(settle_seconds: float, db: AsyncSession):
+    """
+    Return the latest change time that incremental sync may read up to.
+
+    Changes younger than ``settle_seconds`` are left for the next sync, so that
+    a write committed a moment later with an earlier timestamp is not skipped.
+
+    :param settle_seconds: Upper bound on the duration of a write transaction.
+    :type settle_seconds: float
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :return: Database time minus ``settle_seconds``, without time zone like the change timestamps.
+    :rtype: datetime
+    """
+    now = await db.scalar(select(change_now()))
+    return now - timedelta(seconds=settle_seconds)
+
+
+async def get_changes(after_updated: tuple[datetime, int] | None, after_deleted: tuple[datetime, int],
+                      until: datetime, limit: int, db: AsyncSession, user: User):
+    """
+    Retrieve contacts changed and deleted after the given positions, up to ``until``.
+
+    Both lists are keyset scans, over the ``(user_id, updated_at, id)`` index
+    and the ``(user_id, deleted_at, id)`` tombstone index.
+
+    :param after_updated: ``(updated_at, id)`` of the last changed contact already synced, or None for all contacts.
+    :type after_updated: tuple[datetime, int] or None
+    :param after_deleted: ``(deleted_at, id)`` of the last tombstone already synced.
+    :type after_deleted: tuple[datetime, int]
+    :param until: Watermark from ``get_sync_watermark``.
+    :type until: datetime
+    :param limit: Maximum number of contacts and of tombstones to return.
+    :type limit: int
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user whose contacts are synced.
+    :type user: User
+    :return: Changed contacts and tombstones, both in change order.
+    :rtype: tuple[list[Contact], list[ContactTombstone]]
+    """
+    filters_list = [Contact.user_id == user.id, Contact.updated_at <= until]
+    if after_updated is not None:
+        filters_list.append(tuple_(Contact.updated_at, Contact.id)
+                            > tuple_(*after_updated, types=(Contact.updated_at.type, Contact.id.type)))
+    stmt = select(Contact).filter(*filters_list).order_by(Contact.updated_at, Contact.id).limit(limit)
+    updated = (await db.execute(stmt)).scalars().all()
+    stmt = (
+        select(ContactTombstone)
+        .filter(ContactTombstone.user_id == user.id, ContactTombstone.deleted_at <= until,
+                tuple_(ContactTombstone.deleted_at, ContactTombstone.id)
+                > tuple_(*after_deleted, types=(ContactTombstone.deleted_at.type, ContactTombstone.id.type)))
+        .order_by(ContactTombstone.deleted_at, ContactTombstone.id)
+        .limit(limit)
+    )
+    deleted = (await db.execute(stmt)).scalars().all()
+    return updated, deleted
 
 
 async def get_contact(contact_id: int, db: AsyncSession, user: User):
@@ -76,10 +421,48 @@ async def get_contact(contact_id: int, db: AsyncSession, user: User):
     return contact.scalar_one_or_none()
 
 
+async def get_contact_version(contact_id: int, db: AsyncSession, user: User):
+    """
+    Retrieve only the version of a contact owned by the user.
+
+    This is a primary key probe that does not load the row into the session.
+
+    :param contact_id: The ID of the contact.
+    :type contact_id: int
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user who owns the contact.
+    :type user: User
+    :return: The version, or None if the contact does not exist.
+    :rtype: int or None
+    """
+    stmt = select(Contact.version).where(Contact.id == contact_id, Contact.user_id == user.id)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def _contacts_changed(user: User):
+    # Drop cached list responses and keep the user's reads on the primary until replicas catch up.
+    await response_cache.bump(user.id)
+    await replicas.mark_write(user.email)
+
+
+async def _commit_returned(contact: Contact | None, db: AsyncSession, user: User):
+    # Detach the RETURNING row first so that commit does not expire it and force a reload.
+    if contact is not None:
+        db.expunge(contact)
+    await db.commit()
+    if contact is not None:
+        await _contacts_changed(user)
+    return contact
+
+
 async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
     """
     Create a new contact associated with the given user.
 
+    The row is written and read back with a single ``INSERT ... RETURNING``.
+
     :param body: Schema with contact data.
     :type body: ContactSchema
     :param db: Async SQLAlchemy session.
@@ -89,17 +472,69 @@ async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
     :return: The created Contact object.
     :rtype: Contact
     """
-    contact = Contact(**body.model_dump(exclude_unset=True), user=user)  # (title=body.title, description=body.description)
-    db.add(contact)
+    values = body.model_dump(exclude_unset=True)
+    stmt = (
+        insert(Contact)
+        .values(**values, **derived_values(body.model_dump()), user_id=user.id)
+        .returning(Contact)
+    )
+    result = await db.execute(stmt)
+    contact = result.scalar_one()
+    return await _commit_returned(contact, db, user)
+
+
+async def create_contacts_bulk(bodies: list[ContactSchema], db: AsyncSession, user: User):
+    """
+    Insert many contacts with one multi-row INSERT and commit them.
+
+    Rows that violate a unique constraint are skipped with ``ON CONFLICT DO NOTHING``.
+
+    :param bodies: Schemas with contact data.
+    :type bodies: list[ContactSchema]
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user who owns the new contacts.
+    :type user: User
+    :return: Emails of the contacts that were inserted.
+    :rtype: set[str]
+    """
+    dialect_insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    rows = [
+        {**values, **derived_values(values), "user_id": user.id}
+        for values in (body.model_dump() for body in bodies)
+    ]
+    stmt = dialect_insert(Contact).values(rows).on_conflict_do_nothing().returning(Contact.email)
+    result = await db.execute(stmt)
+    inserted = set(result.scalars().all())
     await db.commit()
-    await db.refresh(contact)
-    return contact
+    if inserted:
+        await _contacts_changed(user)
+    return inserted
+
+
+async def _update_returning(contact_id: int, values: dict, db: AsyncSession, user: User, version: int | None):
+    criteria = [Contact.id == contact_id, Contact.user_id == user.id]
+    if version is not None:
+        criteria.append(Contact.version == version)
+    stmt = (
+        update(Contact)
+        .where(*criteria)
+        .values(**values, version=Contact.version + 1)
+        .returning(Contact)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
+    return await _commit_returned(contact, db, user)
 
 
-async def update_contact(contact_id: int, body: ContactSchema, db: AsyncSession, user: User):
+async def update_contact(contact_id: int, body: ContactSchema, db: AsyncSession, user: User,
+                         version: int | None = None):
     """
     Update an existing contact owned by the user.
 
+    The row is changed and read back with a single ``UPDATE ... RETURNING``.
+
     :param contact_id: ID of the contact to update.
     :type contact_id: int
     :param body: Schema with updated contact data.
@@ -108,24 +543,47 @@ async def update_contact(contact_id: int, body: ContactSchema, db: AsyncSession,
     :type db: AsyncSession
     :param user: The user who owns the contact.
     :type user: User
-    :return: The updated Contact object or None if not found.
+    :param version: Only update the contact if it still has this version.
+    :type version: int, optional
+    :return: The updated Contact object or None if not found or the version did not match.
     :rtype: Contact or None
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    result = await db.execute(stmt)
-    contact = result.scalar_one_or_none()
-    if contact:
-        for key, value in body.model_dump().items():
-            setattr(contact, key, value)
-        await db.commit()
-        await db.refresh(contact)
-    return contact
+    values = body.model_dump()
+    values.update(derived_values(values))
+    return await _update_returning(contact_id, values, db, user, version)
+
+
+async def patch_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: User,
+                        version: int | None = None):
+    """
+    Partially update an existing contact owned by the user.
+
+    Only the fields set in ``body`` are written, with a single ``UPDATE ... RETURNING``.
+
+    :param contact_id: ID of the contact to update.
+    :type contact_id: int
+    :param body: Schema with the fields to change.
+    :type body: ContactUpdateSchema
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user who owns the contact.
+    :type user: User
+    :param version: Only update the contact if it still has this version.
+    :type version: int, optional
+    :return: The updated Contact object or None if not found or the version did not match.
+    :rtype: Contact or None
+    """
+    values = body.model_dump(exclude_unset=True)
+    values.update(derived_values(values))
+    return await _update_returning(contact_id, values, db, user, version)
 
 
 async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     """
     Delete a contact by ID if it belongs to the user.
 
+    The row is deleted and returned with a single ``DELETE ... RETURNING``.
+
     :param contact_id: ID of the contact to delete.
     :type contact_id: int
     :param db: Async SQLAlchemy session.
@@ -135,12 +593,14 @@ async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     :return: The deleted Contact object or None if not found.
     :rtype: Contact or None
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    contact = await db.execute(stmt)
-    contact = contact.scalar_one_or_none()
-    if contact:
-        await db.delete(contact)
-        await db.commit()
-    return contact
+    stmt = (
+        delete(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user.id)
+        .returning(Contact)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
+    return await _commit_returned(contact, db, user)
 
 
@@ -0,0 +1,120 @@
+from datetime import UTC, datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi_project.src.database.models import EmailOutbox, User
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def utcnow():
+    """
+    :return: Current UTC time without time zone, as stored in the outbox timestamps.
+    :rtype: datetime
+    """
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+async def enqueue_email(user: User, kind: str, host: str, db: AsyncSession, commit: bool = True):
+    """
+    Queue an email for the outbox worker unless one of the same kind is already pending for the user.
+
+    :param user: The recipient.
+    :type user: User
+    :param kind: Kind of email, a key of ``services.email.EMAIL_KINDS``.
+    :type kind: str
+    :param host: Base URL used in the links of the email.
+    :type host: str
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param commit: Whether to commit; pass False to queue the email in the caller's transaction.
+    :type commit: bool
+    :return: True if the email was queued, False if a pending one already existed.
+    :rtype: bool
+    """
+    dialect_insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(EmailOutbox).values(
+        user_id=user.id, kind=kind, email=user.email, username=user.username, host=host, next_attempt_at=utcnow(),
+    ).on_conflict_do_nothing()
+    result = await db.execute(stmt)
+    if commit:
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def claim_emails(limit: int, lease_seconds: float, db: AsyncSession):
+    """
+    Claim due pending emails for one worker and count the attempt.
+
+    Claimed emails become due again after ``lease_seconds``, so the emails of a
+    worker that dies while sending are picked up by another. On PostgreSQL rows
+    claimed by a concurrent worker are skipped with ``FOR UPDATE SKIP LOCKED``.
+
+    :param limit: Maximum number of emails to claim.
+    :type limit: int
+    :param lease_seconds: Time the worker has to send and record the emails.
+    :type lease_seconds: float
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :return: Claimed emails, detached from the session.
+    :rtype: list[EmailOutbox]
+    """
+    now = utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == PENDING, EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=lease_seconds), attempts=EmailOutbox.attempts + 1)
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    emails = result.scalars().all()
+    for email in emails:
+        db.expunge(email)
+    await db.commit()
+    return sorted(emails, key=lambda email: email.id)
+
+
+async def complete_emails(email_ids: list[int], db: AsyncSession):
+    """
+    Mark emails as sent.
+
+    :param email_ids: IDs of the sent emails.
+    :type email_ids: list[int]
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    """
+    if not email_ids:
+        return
+    stmt = update(EmailOutbox).where(EmailOutbox.id.in_(email_ids)).values(status=SENT, sent_at=utcnow())
+    await db.execute(stmt.execution_options(synchronize_session=False))
+    await db.commit()
+
+
+async def fail_email(email_id: int, error: str, retry_at: datetime | None, db: AsyncSession):
+    """
+    Record a failed attempt, scheduling a retry or giving up.
+
+    :param email_id: ID of the email.
+    :type email_id: int
+    :param error: Description of the error.
+    :type error: str
+    :param retry_at: When to try again, or None to mark the email as failed.
+    :type retry_at: datetime or None
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    """
+    values = {"status": FAILED} if retry_at is None else {"next_attempt_at": retry_at}
+    stmt = update(EmailOutbox).where(EmailOutbox.id == email_id).values(last_error=error, **values)
+    await db.execute(stmt.execution_options(synchronize_session=False))
+    await db.commit()
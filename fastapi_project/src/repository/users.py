@@ -2,9 +2,11 @@ from fastapi import Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
-from fastapi_project.src.database.db import get_db
+from fastapi_project.src.database.db import get_db, replicas
 from fastapi_project.src.database.models import User
+from fastapi_project.src.repository import outbox as repository_outbox
 from fastapi_project.src.schemas import UserSchema
+from fastapi_project.src.services.user_cache import user_cache
 
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
@@ -24,7 +26,7 @@ async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
     return user
 
 
-async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
+async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db), confirm_host: str | None = None):
     """
     Create a new user with optional Gravatar avatar.
 
@@ -32,6 +34,9 @@ async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
     :type body: UserSchema
     :param db: Async SQLAlchemy session.
     :type db: AsyncSession
+    :param confirm_host: Base URL for the confirmation link; if given, the
+        confirmation email is queued in the same transaction as the user.
+    :type confirm_host: str, optional
     :return: The newly created User object.
     :rtype: User
     """
@@ -45,6 +50,9 @@ async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
 
     new_user = User(**body.model_dump(), avatar=avatar)
     db.add(new_user)
+    if confirm_host is not None:
+        await db.flush()
+        await repository_outbox.enqueue_email(new_user, "confirm", confirm_host, db, commit=False)
     await db.commit()
     await db.refresh(new_user)
     return new_user
@@ -63,6 +71,8 @@ async def update_token(user: User, token: str | None, db: AsyncSession):
     """
     user.refresh_token = token
     await db.commit()
+    await user_cache.invalidate(user.email)
+    await replicas.mark_write(user.email)
 
 async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
@@ -76,10 +86,12 @@ async def confirmed_email(email: str, db: AsyncSession) -> None:
     user = await get_user_by_email(email, db)
     user.confirmed = True
     await db.commit()
+    await user_cache.invalidate(email)
+    await replicas.mark_write(email)
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> User:
     """
-    Update the avatar URL of a user.
+    Update the avatar URL of a user and increment the user's version.
 
     :param email: Email address of the user.
     :type email: str
@@ -92,8 +104,11 @@ async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> Us
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
+    user.version = User.version + 1
     await db.commit()
     await db.refresh(user)
+    await user_cache.invalidate(email)
+    await replicas.mark_write(email)
     return user
 
 async def update_user_password(user: User, hash_password, db: AsyncSession):
@@ -109,4 +124,6 @@ async def update_user_password(user: User, hash_password, db: AsyncSession):
     """
     user.password = hash_password
     await db.commit()
+    await user_cache.invalidate(user.email)
+    await replicas.mark_write(user.email)
 
@@ -1,24 +1,23 @@
-from fastapi import Form, APIRouter, HTTPException, Depends, status, BackgroundTasks, Request, Response
+from fastapi import Form, APIRouter, HTTPException, Depends, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi.templating import Jinja2Templates
 from fastapi_project.src.database.db import get_db
 from fastapi_project.src.repository import users as repositories_users
+from fastapi_project.src.repository import outbox as repository_outbox
 from fastapi_project.src.schemas import UserSchema, TokenSchema, UserResponse, RequestEmail
 from fastapi_project.src.services.auth import auth_service
-from fastapi_project.src.services.email import send_email, send_rp_email
+from fastapi_project.src.services.templating import template_service
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-templates = Jinja2Templates(directory="fastapi_project/src/services/templates")
+templates = template_service.templates
 get_refresh_token = HTTPBearer()
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def signup(body: UserSchema, request: Request, db: AsyncSession = Depends(get_db)):
     """
-    Register a new user account.
+    Register a new user account and queue the confirmation email.
 
     :param body: User registration data.
-    :param bt: Background task manager.
     :param request: HTTP request object.
     :param db: Database session.
     :return: Created user details.
@@ -27,9 +26,8 @@ async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: As
     exist_user = await repositories_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Account already exists')
-    body.password = auth_service.get_password_hash(body.password)
-    new_user = await repositories_users.create_user(body, db)
-    bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
+    body.password = await auth_service.get_password_hash_async(body.password)
+    new_user = await repositories_users.create_user(body, db, confirm_host=str(request.base_url))
     return new_user
 
 @router.post("/login",  response_model=TokenSchema)
@@ -47,7 +45,7 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password_async(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
@@ -98,13 +96,11 @@ async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     return {"message": "Email confirmed"}
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: AsyncSession = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     """
-    Send a confirmation email if the email is not confirmed yet.
+    Queue a confirmation email if the email is not confirmed yet.
 
     :param body: Email input.
-    :param background_tasks: Background task manager.
     :param request: HTTP request object.
     :param db: Database session.
     :return: Status message.
@@ -114,17 +110,15 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, str(request.base_url))
+        await repository_outbox.enqueue_email(user, "confirm", str(request.base_url), db)
     return {"message": "Check your email for confirmation."}
 
 @router.post('/request_reset_password')
-async def request_reset_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: AsyncSession = Depends(get_db)):
+async def request_reset_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     """
-    Send a password reset email.
+    Queue a password reset email.
 
     :param body: Email input.
-    :param background_tasks: Background task manager.
     :param request: HTTP request object.
     :param db: Database session.
     :return: Status message.
@@ -134,7 +128,7 @@ async def request_reset_email(body: RequestEmail, background_tasks: BackgroundTa
     if not user:
         return {"message": f"No user with email {body.email}"}
     if user:
-        background_tasks.add_task(send_rp_email, user.email, user.username, str(request.base_url))
+        await repository_outbox.enqueue_email(user, "reset", str(request.base_url), db)
     return {"message": "Check your email for reset password."}
 
 @router.get('/reset_password_form/{token}')
@@ -169,7 +163,7 @@ async def reset_password(
     if new_password != confirm_password:
 
         return templates.TemplateResponse(
-            "reset_password.html",
+            "reset_password_form.html",
             {"request": request, "token": token, "error": "Passwords do not match"}
         )
 
@@ -177,6 +171,6 @@ async def reset_password(
     user = await repositories_users.get_user_by_email(email, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
-    hash_password = auth_service.get_password_hash(new_password)
+    hash_password = await auth_service.get_password_hash_async(new_password)
     await repositories_users.update_user_password(user, hash_password, db)
     return {"message": "Password updated."}
@@ -1,16 +1,156 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
-from fastapi_project.src.database.db import get_db
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Literal, Optional
+from fastapi_project.src.database.db import get_db, get_session_maker
 from fastapi_project.src.repository import contacts as repositories_contacts
-from fastapi_project.src.schemas import ContactSchema, ContactResponseSchema
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.schemas import (ContactSchema, ContactUpdateSchema, ContactResponseSchema, ContactChangesSchema,
+                                         ImportReportSchema)
 from fastapi_project.src.database.models import User
-from fastapi_project.src.services.auth import auth_service
+from fastapi_project.src.services import contacts_io
+from fastapi_project.src.services.auth import auth_service, get_read_db
+from fastapi_project.src.services.response_cache import response_cache
+from fastapi_project.src.services.etag import make_etag, etag_matches, not_modified
 
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+contact_list_adapter = TypeAdapter(list[ContactResponseSchema])
+
+
+def encode_cursor(sort_key: tuple):
+    """
+    Encode a sort key into an opaque pagination cursor.
+
+    :param sort_key: Sort key of the last contact on a page.
+    :type sort_key: tuple
+    :return: URL-safe cursor string.
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(json.dumps(sort_key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: tuple):
+    """
+    Decode an opaque pagination cursor back into a sort key.
+
+    :param cursor: Cursor string from a previous response.
+    :type cursor: str
+    :param types: Expected type of every sort key item.
+    :type types: tuple
+    :raises HTTPException: If the cursor is malformed.
+    :return: The sort key.
+    :rtype: tuple
+    """
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        sort_key = None
+    if (not isinstance(sort_key, list) or len(sort_key) != len(types)
+            or not all(type(value) is expected for value, expected in zip(sort_key, types))):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return tuple(sort_key)
+
+
+def next_cursor_headers(contacts: list, limit: int, sort_key):
+    """
+    Build the header with the cursor of the next page when the page is full.
+
+    :param contacts: Contacts of the current page.
+    :type contacts: list[Contact]
+    :param limit: Requested page size.
+    :type limit: int
+    :param sort_key: Function returning the sort key of a contact.
+    :type sort_key: callable
+    :return: Response headers, empty on the last page.
+    :rtype: dict
+    """
+    if contacts and len(contacts) == limit:
+        return {NEXT_CURSOR_HEADER: encode_cursor(sort_key(contacts[-1]))}
+    return {}
+
+
+def contacts_json(contacts: list):
+    """
+    Serialize contacts the way ``response_model=list[ContactResponseSchema]`` does.
+
+    :param contacts: Contacts to serialize.
+    :type contacts: list[Contact]
+    :return: JSON array.
+    :rtype: bytes
+    """
+    return contact_list_adapter.dump_json(contact_list_adapter.validate_python(contacts, from_attributes=True))
+
+
+def contact_etag(contact):
+    """
+    Build the strong entity tag of a contact from its version.
+
+    :param contact: The contact.
+    :type contact: Contact
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    return make_etag(contact.version)
+
+
+def if_match_version(if_match: Optional[str]):
+    """
+    Extract the expected contact version from an ``If-Match`` header.
+
+    :param if_match: Value of the ``If-Match`` header.
+    :type if_match: str, optional
+    :raises HTTPException: 412 if the header is not a strong entity tag issued by ``contact_etag``.
+    :return: The expected version, or None if any version is acceptable.
+    :rtype: int or None
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if len(tag) < 3 or tag[0] != '"' or tag[-1] != '"' or not tag[1:-1].isdigit():
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="PRECONDITION FAILED")
+    return int(tag[1:-1])
+
+
+async def write_result(contact, version: Optional[int], contact_id: int, response: Response,
+                       db: AsyncSession, current_user: User):
+    """
+    Turn the result of a conditional write into a response.
+
+    The extra lookup only happens when the write matched no row, to tell a
+    missing contact from a stale ``If-Match`` version.
+
+    :param contact: The written contact, or None if no row matched.
+    :type contact: Contact or None
+    :param version: The version required by ``If-Match``.
+    :type version: int, optional
+    :param contact_id: ID of the contact.
+    :type contact_id: int
+    :param response: Outgoing response.
+    :type response: Response
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException: 412 if the contact has another version, 404 if it does not exist.
+    :return: The written contact.
+    :rtype: Contact
+    """
+    if contact is None:
+        if version is not None and await repositories_contacts.get_contact(contact_id, db, current_user) is not None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="PRECONDITION FAILED")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
+    response.headers["ETag"] = contact_etag(contact)
+    return contact
+
 
 @router.get("/", response_model=list[ContactResponseSchema], description='No more than 10 requests per minute',
             dependencies=[Depends(RateLimiter(times=10, seconds=60, identifier=auth_service.get_email_from_request))]
@@ -18,66 +158,212 @@ router = APIRouter(prefix='/contacts', tags=['contacts'])
 async def get_contacts(
     limit: int = Query(10, ge=10, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
         first_name: Optional[str] = Query(None),
         last_name: Optional[str] = Query(None),
         email: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)
+        phone_number: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)
 ):
     """
     Retrieve a list of contacts with optional filters.
 
+    Full pages carry the cursor of the next page in the ``X-Next-Cursor`` header.
+    With ``q`` the contacts are searched by prefix and ranked by relevance
+    instead; search results are paginated with ``offset`` only. Responses are
+    cached per user until one of the user's contacts changes.
+
     :param limit: Maximum number of contacts to return. Must be between 10 and 500.
     :type limit: int
     :param offset: Number of records to skip.
     :type offset: int
+    :param cursor: Opaque cursor from ``X-Next-Cursor`` of the previous page.
+    :type cursor: Optional[str]
+    :param q: Search names, email, phone number and additional info.
+    :type q: Optional[str]
     :param first_name: Filter contacts by first name.
     :type first_name: Optional[str]
     :param last_name: Filter contacts by last name.
     :type last_name: Optional[str]
-    :param email: Filter contacts by email.
+    :param email: Filter contacts by email, ignoring case.
     :type email: Optional[str]
-    :param db: Database session.
+    :param phone_number: Filter contacts by phone number, ignoring formatting.
+    :type phone_number: Optional[str]
+    :param if_none_match: Entity tag of the client's copy; answered with 304 if still current.
+    :type if_none_match: Optional[str]
+    :param db: Read-only database session, bound to a replica when one is available.
     :type db: AsyncSession
     :param current_user: Current authenticated user.
     :type current_user: User
     :return: List of contacts.
     :rtype: list[ContactResponseSchema]
     """
-    get_filters = {"first_name": first_name, "last_name": last_name, "email": email}
+    get_filters = {"first_name": first_name, "last_name": last_name, "email": email, "phone_number": phone_number}
     use_get_filters={k:v for k,v in get_filters.items() if v}
-    contacts = await repositories_contacts.get_contacts(limit, offset, use_get_filters, db, current_user)
-    return contacts
+    if q and cursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor cannot be combined with q")
+    after = decode_cursor(cursor, (str, str, int)) if cursor else None
+
+    async def load():
+        if q:
+            contacts = await repositories_contacts.search_contacts(q, limit, offset, use_get_filters, db, current_user)
+            return contacts_json(contacts), {}
+        contacts = await repositories_contacts.get_contacts(limit, offset, use_get_filters, db, current_user, after)
+        return contacts_json(contacts), next_cursor_headers(contacts, limit, repositories_contacts.contact_sort_key)
+
+    params = {"limit": limit, "offset": offset, "cursor": cursor, "q": q, **use_get_filters}
+    body, headers = await response_cache.serve("contacts", current_user.id, params, load, if_none_match)
+    if body is None:
+        return not_modified(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/birthday", response_model=list[ContactResponseSchema])
 async def get_contacts_by_birthday(limit: int = Query(10, ge=10, le=500),
-    offset: int = Query(0, ge=0), days: int = Query(7, ge=1), db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    offset: int = Query(0, ge=0), cursor: Optional[str] = Query(None), days: int = Query(7, ge=1),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve contacts with birthdays within a number of upcoming days.
 
+    Full pages carry the cursor of the next page in the ``X-Next-Cursor`` header.
+    Responses are cached per user and day until one of the user's contacts changes.
+
     :param limit: Maximum number of contacts to return.
     :type limit: int
     :param offset: Number of records to skip.
     :type offset: int
+    :param cursor: Opaque cursor from ``X-Next-Cursor`` of the previous page.
+    :type cursor: Optional[str]
     :param days: Number of upcoming days to check for birthdays.
     :type days: int
-    :param db: Database session.
+    :param if_none_match: Entity tag of the client's copy; answered with 304 if still current.
+    :type if_none_match: Optional[str]
+    :param db: Read-only database session, bound to a replica when one is available.
     :type db: AsyncSession
     :param current_user: Current authenticated user.
     :type current_user: User
     :return: List of contacts with upcoming birthdays.
     :rtype: list[ContactResponseSchema]
     """
-    contacts = await repositories_contacts.get_birthdays_contacts(limit, offset, days, db, current_user)
-    return contacts
+    after = decode_cursor(cursor, (int, int)) if cursor else None
+
+    async def load():
+        contacts = await repositories_contacts.get_birthdays_contacts(limit, offset, days, db, current_user, after)
+        return contacts_json(contacts), next_cursor_headers(contacts, limit, repositories_contacts.birthday_sort_key)
+
+    params = {"limit": limit, "offset": offset, "cursor": cursor, "days": days, "today": date.today()}
+    body, headers = await response_cache.serve("birthday", current_user.id, params, load, if_none_match)
+    if body is None:
+        return not_modified(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/export", response_class=StreamingResponse, description='No more than 2 requests per minute',
+            dependencies=[Depends(RateLimiter(times=2, seconds=60, identifier=auth_service.get_email_from_request))])
+async def export_contacts(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                          gzip: bool = Query(False),
+                          session_maker: async_sessionmaker = Depends(get_session_maker),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Stream all contacts of the current user as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and sent as they are encoded,
+    so memory use does not depend on the size of the address book.
+
+    :param export_format: Output format, ``ndjson`` or ``csv``.
+    :type export_format: str
+    :param gzip: Whether to gzip the output.
+    :type gzip: bool
+    :param session_maker: Session factory; the stream outlives the request-scoped session.
+    :type session_maker: async_sessionmaker
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: Streaming file download.
+    :rtype: StreamingResponse
+    """
+    async def body():
+        async with session_maker() as session:
+            contacts = await repositories_contacts.stream_contacts(session, current_user)
+            async for chunk in contacts_io.export_contacts(contacts, export_format, gzip):
+                yield chunk
+
+    filename = f"contacts.{export_format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else contacts_io.EXPORT_MEDIA_TYPES[export_format]
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/changes", response_model=ContactChangesSchema)
+async def get_changes(since: Optional[str] = Query(None), limit: int = Query(100, ge=10, le=500),
+                      db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contacts created, changed or deleted since a sync token.
+
+    Without ``since`` the first call returns all contacts, page by page. Pass
+    ``next_since`` of each response to the next call; while ``has_more`` is
+    true there are more changes to fetch right away. Clients should apply
+    ``deleted`` before ``updated``. Changes show up after
+    ``SYNC_SETTLE_SECONDS``.
+
+    :param since: ``next_since`` of the previous response.
+    :type since: Optional[str]
+    :param limit: Maximum number of changed contacts and of deleted IDs to return.
+    :type limit: int
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException: If the token is malformed.
+    :return: Changed contacts, deleted contact IDs and the next sync token.
+    :rtype: ContactChangesSchema
+    """
+    until = await repositories_contacts.get_sync_watermark(config.SYNC_SETTLE_SECONDS, db)
+    if since:
+        updated_at, updated_id, deleted_at, deleted_id = decode_cursor(since, (str, int, str, int))
+        try:
+            after_updated = (datetime.fromisoformat(updated_at), updated_id) if updated_at else None
+            after_deleted = (datetime.fromisoformat(deleted_at), deleted_id)
+            if any(position and position[0].tzinfo is not None for position in (after_updated, after_deleted)):
+                raise ValueError("sync tokens carry naive timestamps")
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    else:
+        after_updated, after_deleted = None, (until, 0)
+    updated, deleted = await repositories_contacts.get_changes(after_updated, after_deleted, until, limit, db,
+                                                               current_user)
+    if updated:
+        after_updated = (updated[-1].updated_at, updated[-1].id)
+    if deleted:
+        after_deleted = (deleted[-1].deleted_at, deleted[-1].id)
+    next_since = encode_cursor((
+        after_updated[0].isoformat() if after_updated else "", after_updated[1] if after_updated else 0,
+        after_deleted[0].isoformat(), after_deleted[1],
+    ))
+    return {
+        "updated": updated,
+        "deleted": [tombstone.contact_id for tombstone in deleted],
+        "next_since": next_since,
+        "has_more": len(updated) == limit or len(deleted) == limit,
+    }
+
 
 @router.get("/{contact_id}", response_model=ContactResponseSchema)
-async def get_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def get_contact(response: Response, contact_id: int = Path(ge=1), if_none_match: Optional[str] = Header(None),
+                      db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a specific contact by ID.
 
+    The ``ETag`` header carries the contact version for use in ``If-Match`` and
+    ``If-None-Match``. A current ``If-None-Match`` is answered with 304 after
+    probing only the version column.
+
+    :param response: Outgoing response.
+    :type response: Response
     :param contact_id: ID of the contact.
     :type contact_id: int
-    :param db: Database session.
+    :param if_none_match: Entity tag of the client's copy.
+    :type if_none_match: Optional[str]
+    :param db: Read-only database session, bound to a replica when one is available.
     :type db: AsyncSession
     :param current_user: Current authenticated user.
     :type current_user: User
@@ -85,9 +371,14 @@ async def get_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(g
     :return: Contact details.
     :rtype: ContactResponseSchema
     """
+    if if_none_match is not None:
+        version = await repositories_contacts.get_contact_version(contact_id, db, current_user)
+        if version is not None and etag_matches(if_none_match, make_etag(version)):
+            return not_modified(make_etag(version))
     contact = await repositories_contacts.get_contact(contact_id, db, current_user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
+    response.headers["ETag"] = contact_etag(contact)
     return contact
 
 
@@ -110,26 +401,90 @@ async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db)
     return contact
 
 
+@router.post("/import", response_model=ImportReportSchema,
+             description='Streams a text/csv or application/x-ndjson body. No more than 2 requests per minute',
+             dependencies=[Depends(RateLimiter(times=2, seconds=60, identifier=auth_service.get_email_from_request))])
+async def import_contacts(request: Request, db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Import contacts in bulk from a CSV (with a header row) or NDJSON request body.
+
+    Rows are validated and inserted in batches while the body is being received.
+    Invalid rows and rows that clash with existing contacts are reported, not imported.
+
+    :param request: HTTP request with the contacts file as body.
+    :type request: Request
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException: If the content type is not supported.
+    :return: Number of imported and failed rows with per-row errors.
+    :rtype: ImportReportSchema
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in contacts_io.IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Expected one of {', '.join(contacts_io.IMPORT_FORMATS)}")
+    return await contacts_io.import_contacts(request.stream(), content_type, config.IMPORT_CHUNK_SIZE, db,
+                                             current_user)
+
+
 @router.put("/{contact_id}")
-async def update_contact(body: ContactSchema, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def update_contact(body: ContactSchema, response: Response, contact_id: int = Path(ge=1),
+                         if_match: Optional[str] = Header(None),
+                         db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Update a contact by ID.
 
     :param body: Updated contact data.
     :type body: ContactSchema
+    :param response: Outgoing response.
+    :type response: Response
     :param contact_id: ID of the contact to update.
     :type contact_id: int
+    :param if_match: Entity tag the contact must still have.
+    :type if_match: str, optional
     :param db: Database session.
     :type db: AsyncSession
     :param current_user: Current authenticated user.
     :type current_user: User
-    :raises HTTPException: If contact not found.
+    :raises HTTPException: If contact not found or its version does not match ``If-Match``.
     :return: Updated contact.
     """
-    contact = await repositories_contacts.update_contact(contact_id, body, db, current_user)
-    if contact is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
-    return contact
+    version = if_match_version(if_match)
+    contact = await repositories_contacts.update_contact(contact_id, body, db, current_user, version)
+    return await write_result(contact, version, contact_id, response, db, current_user)
+
+
+@router.patch("/{contact_id}", response_model=ContactResponseSchema)
+async def patch_contact(body: ContactUpdateSchema, response: Response, contact_id: int = Path(ge=1),
+                        if_match: Optional[str] = Header(None),
+                        db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Change only the given fields of a contact.
+
+    With ``If-Match`` the update is applied only if the contact still has that
+    entity tag, checked in the same UPDATE statement.
+
+    :param body: Fields to change.
+    :type body: ContactUpdateSchema
+    :param response: Outgoing response.
+    :type response: Response
+    :param contact_id: ID of the contact to update.
+    :type contact_id: int
+    :param if_match: Entity tag the contact must still have.
+    :type if_match: str, optional
+    :param db: Database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException: If contact not found or its version does not match ``If-Match``.
+    :return: Updated contact.
+    """
+    version = if_match_version(if_match)
+    contact = await repositories_contacts.patch_contact(contact_id, body, db, current_user, version)
+    return await write_result(contact, version, contact_id, response, db, current_user)
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends
+from fastapi_project.src.database.db import pool_monitor, replicas
+from fastapi_project.src.services.auth import auth_service
+from fastapi_project.src.services.avatars import avatar_uploader
+from fastapi_project.src.services.response_cache import response_cache
+from fastapi_project.src.services.user_cache import user_cache
+
+router = APIRouter(prefix="/stats", tags=["stats"], dependencies=[Depends(auth_service.get_current_user)])
+
+
+@router.get("/user_cache")
+async def user_cache_stats():
+    """
+    Hit, miss and eviction counters of the in-process and Redis user cache tiers.
+
+    :return: Counters per cache tier.
+    :rtype: dict
+    """
+    return user_cache.stats()
+
+
+@router.get("/response_cache")
+async def response_cache_stats():
+    """
+    Hits, misses and hit ratio of the contacts response cache per route.
+
+    :return: Counters per cached route.
+    :rtype: dict
+    """
+    return response_cache.stats()
+
+
+@router.get("/db_pool")
+async def db_pool_stats():
+    """
+    Database connection pool use and saturation.
+
+    ``saturation`` is the share of ``pool_size + max_overflow`` connections
+    checked out; ``timeouts`` counts checkouts that gave up after ``DB_POOL_TIMEOUT``.
+
+    :return: Pool counters.
+    :rtype: dict
+    """
+    return pool_monitor.stats()
+
+
+@router.get("/db_replicas")
+async def db_replicas_stats():
+    """
+    Health, read counts and pool use of the read replicas.
+
+    ``primary_reads`` counts reads sent to the primary because no replica was
+    healthy or the user had just written.
+
+    :return: Replica counters.
+    :rtype: dict
+    """
+    return replicas.stats()
+
+
+@router.get("/avatars")
+async def avatar_stats():
+    """
+    Avatar uploads queued, in flight, stored and failed since startup.
+
+    :return: Upload counters.
+    :rtype: dict
+    """
+    return avatar_uploader.stats()
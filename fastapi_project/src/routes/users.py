@@ -1,28 +1,21 @@
-import pickle
-import cloudinary
-import cloudinary.uploader
+from typing import Optional
 from fastapi import (
     APIRouter,
     Depends,
     UploadFile,
     File,
+    Header,
+    Response,
+    status,
 )
 from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_project.src.database.db import get_db
 from fastapi_project.src.database.models import User
 from fastapi_project.src.schemas import UserResponse
 from fastapi_project.src.services.auth import auth_service
-from fastapi_project.src.conf.config import config
-from fastapi_project.src.repository import users as repositories_users
+from fastapi_project.src.services.avatars import avatar_uploader
+from fastapi_project.src.services.etag import make_etag, etag_matches, not_modified
 
 router = APIRouter(prefix="/users", tags=["users"])
-cloudinary.config(
-    cloud_name=config.CLOUDINARY_NAME,
-    api_key=config.CLOUDINARY_API_KEY,
-    api_secret=config.CLOUDINARY_API_SECRET,
-    secure=True,
-)
 
 
 @router.get(
@@ -30,48 +23,56 @@ cloudinary.config(
     response_model=UserResponse,
     dependencies=[Depends(RateLimiter(times=1, seconds=20))],
 )
-async def get_current_user(user: User = Depends(auth_service.get_current_user)):
+async def get_current_user(response: Response, if_none_match: Optional[str] = Header(None),
+                           user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve the current authenticated user.
 
+    The ``ETag`` header carries the profile version. The user normally comes
+    from the user cache, so a current ``If-None-Match`` is answered with 304
+    without a database query.
+
+    :param response: Outgoing response.
+    :type response: Response
+    :param if_none_match: Entity tag of the client's copy.
+    :type if_none_match: Optional[str]
     :param user: The current authenticated user, resolved from the access token.
     :type user: User
     :return: The authenticated user's details.
     :rtype: UserResponse
     """
+    etag = make_etag(user.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return user
 
 
 @router.patch(
     "/avatar",
     response_model=UserResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     dependencies=[Depends(RateLimiter(times=1, seconds=60, identifier=auth_service.get_email_from_request))],
 )
 async def update_user_avatar(
     file: UploadFile = File(),
     user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """
-    Upload and update the avatar for the current user.
+    Upload a new avatar for the current user.
 
-    The image is uploaded to Cloudinary and a resized (250x250) image URL is stored in the database.
+    The image is staged on disk and the request returns 202; it is then
+    resized to 250x250, by Cloudinary or by the local image pipeline, and
+    stored in the background, after which ``avatar`` points at the new image.
 
-    :param file: The uploaded avatar image file.
+    :param file: The uploaded avatar image file, at most ``AVATAR_MAX_BYTES``.
     :type file: UploadFile
     :param user: The current authenticated user.
     :type user: User
-    :param db: Database session.
-    :type db: AsyncSession
-    :return: The updated user with the new avatar URL.
+    :raises HTTPException: 413 if the file is too large, 415 if it is not a
+        supported image.
+    :return: The user with the avatar it had before the upload.
     :rtype: UserResponse
     """
-    public_id = f"Web16/{user.email}"
-    res = cloudinary.uploader.upload(file.file, public_id=public_id, owerite=True)
-    res_url = cloudinary.CloudinaryImage(public_id).build_url(
-        width=250, height=250, crop="fill", version=res.get("version")
-    )
-    user = await repositories_users.update_avatar_url(user.email, res_url, db)
-    auth_service.cache.set(user.email, pickle.dumps(user))
-    auth_service.cache.expire(user.email, 300)
-    return user
\ No newline at end of file
+    await avatar_uploader.enqueue(file, user)
+    return user
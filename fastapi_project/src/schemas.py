@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 
 
 class ContactSchema(BaseModel):
@@ -12,6 +12,23 @@ class ContactSchema(BaseModel):
     add_info: Optional[str]=''
 
 
+class ContactUpdateSchema(BaseModel):
+    first_name: Optional[str] = Field(None, max_length=150)
+    last_name: Optional[str] = Field(None, max_length=150)
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = Field(None, max_length=30)
+    birthday: Optional[date] = None
+    add_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone_number", "birthday")
+    @classmethod
+    def not_null(cls, value):
+        # Omit a field to keep it; only add_info may be cleared with null.
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
 class ContactResponseSchema(ContactSchema):
 
     id: int = 1
@@ -20,6 +37,23 @@ class ContactResponseSchema(ContactSchema):
     # class Config:
     #     from_attributes = True
 
+class ContactChangesSchema(BaseModel):
+    updated: list[ContactResponseSchema]
+    deleted: list[int]
+    next_since: str
+    has_more: bool
+
+
+class ImportErrorSchema(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportReportSchema(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[ImportErrorSchema] = []
+
 class UserSchema(BaseModel):
     username: str = Field(min_length=3, max_length=50)
     email: EmailStr
@@ -1,6 +1,9 @@
 from typing import Optional
-import pickle
-import redis
+import asyncio
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
@@ -9,24 +12,88 @@ from datetime import datetime, timedelta, UTC
 from fastapi_project.src.conf.config import config
 from sqlalchemy.ext.asyncio import AsyncSession
 from urllib.request import Request
-from fastapi_project.src.database.db import get_db
+from fastapi_project.src.database.db import get_db, replicas
+from fastapi_project.src.database.models import User
 from fastapi_project.src.repository import users as repository_users
+from fastapi_project.src.services.cache import LRUCache
+from fastapi_project.src.services.user_cache import user_cache
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verify_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash_password(password: str):
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded executor.
+
+    At most ``workers + queue_size`` calls may be pending; further calls are
+    rejected with 503 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        self.kind = kind
+        self.workers = workers
+        self.limit = workers + queue_size
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                # The app process runs executor threads; forking it could copy a held lock into the workers.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("forkserver"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Run a hashing function in the executor.
+
+        :param func: Module-level hashing function.
+        :param args: Arguments of the function.
+        :raises HTTPException: 503 if the executor queue is saturated.
+        :return: Result of the function.
+        """
+        if self.pending >= self.limit:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, try again later", headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        """
+        Shut down the executor, it is recreated on next use.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
 
 class Auth:
     """
     A class responsible for handling authentication, token generation, and user retrieval.
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = pwd_context
+    password_hasher = PasswordHasher(config.PASSWORD_HASH_EXECUTOR, config.PASSWORD_HASH_WORKERS,
+                                     config.PASSWORD_HASH_QUEUE_SIZE)
     SECRET_KEY = config.SECRET_KEY_JWT
     ALGORITHM = config.ALGORITHM
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    cache = redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        db=0,
-        password=config.REDIS_PASSWORD,
-    )
+    user_cache = user_cache
+    token_cache = LRUCache(config.JWT_CACHE_SIZE, config.JWT_CACHE_TTL)
 
     def verify_password(self, plain_password, hashed_password):
         """
@@ -52,6 +119,54 @@ class Auth:
         """
         return self.pwd_context.hash(password)
 
+    async def verify_password_async(self, plain_password: str, hashed_password: str):
+        """
+        Verify a password in the password hashing executor without blocking the event loop.
+
+        :param plain_password: The plain password.
+        :type plain_password: str
+        :param hashed_password: The hashed password.
+        :type hashed_password: str
+        :raises HTTPException: 503 if the executor queue is saturated.
+        :return: True if passwords match, False otherwise.
+        :rtype: bool
+        """
+        return await self.password_hasher.run(_verify_password, plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str):
+        """
+        Hash a password in the password hashing executor without blocking the event loop.
+
+        :param password: Plain password to hash.
+        :type password: str
+        :raises HTTPException: 503 if the executor queue is saturated.
+        :return: The hashed password.
+        :rtype: str
+        """
+        return await self.password_hasher.run(_hash_password, password)
+
+    def decode_token(self, token: str):
+        """
+        Verify a JWT and return its claims.
+
+        Verified claims are cached by the SHA-256 digest of the token until the
+        token expires, so a hot token skips signature verification.
+
+        :param token: Encoded JWT.
+        :type token: str
+        :return: Token claims.
+        :rtype: dict
+        :raises JWTError: If the token is invalid or expired.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.token_cache.get(key)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            ttl = payload.get("exp", 0) - time.time()
+            if ttl > 0:
+                self.token_cache.set(key, payload, ttl)
+        return payload
+
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
         Generate a new access token.
@@ -104,7 +219,7 @@ class Auth:
         :raises HTTPException: If token is invalid or scope is incorrect.
         """
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(refresh_token)
             if payload['scope'] == 'refresh_token':
                 email = payload['sub']
                 return email
@@ -122,10 +237,10 @@ class Auth:
 
         :param token: JWT token from request header.
         :type token: str
-        :param db: Database session.
+        :param db: Database session, used on a cache miss unless a read replica is available.
         :type db: AsyncSession
-        :return: The authenticated user object.
-        :rtype: User
+        :return: The authenticated user, restored from the cache when possible.
+        :rtype: User or CachedUser
         :raises HTTPException: If token is invalid or user not found.
         """
         credentials_exception = HTTPException(
@@ -136,7 +251,7 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             if payload["scope"] == "access_token":
                 email = payload["sub"]
                 if email is None:
@@ -148,18 +263,21 @@ class Auth:
 
         user_hash = str(email)
 
-        user = self.cache.get(user_hash)
+        user = await self.user_cache.get(user_hash)
 
         if user is None:
             print("User from database")
-            user = await repository_users.get_user_by_email(email, db)
+            session_maker = await replicas.session_maker(email)
+            if session_maker is replicas.primary:
+                user = await repository_users.get_user_by_email(email, db)
+            else:
+                async with session_maker() as read_db:
+                    user = await repository_users.get_user_by_email(email, read_db)
             if user is None:
                 raise credentials_exception
-            self.cache.set(user_hash, pickle.dumps(user))
-            self.cache.expire(user_hash, 900)
+            await self.user_cache.set(user)
         else:
             print("User from cache")
-            user = pickle.loads(user)
         return user
 
     def create_email_token(self, data: dict):
@@ -188,7 +306,7 @@ class Auth:
         :raises HTTPException: If token is invalid or cannot be decoded.
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             email = payload["sub"]
             return email
         except JWTError as e:
@@ -214,5 +332,28 @@ class Auth:
 auth_service = Auth()
 
 
+async def get_read_db(current_user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Provide a session for read-only queries of the current user.
+
+    The session is bound to a healthy read replica. Without one, or if the user
+    wrote within ``DB_REPLICA_STICKY_SECONDS``, the request's primary session
+    is returned, so users always see their own changes.
+
+    :param current_user: The authenticated user.
+    :type current_user: User
+    :param db: The request's primary database session.
+    :type db: AsyncSession
+    :return: Async SQLAlchemy session.
+    :rtype: AsyncSession
+    """
+    session_maker = await replicas.session_maker(current_user.email)
+    if session_maker is replicas.primary:
+        yield db
+        return
+    async with session_maker() as session:
+        yield session
+
+
 def get_password_hash():
-    return None
\ No newline at end of file
+    return None
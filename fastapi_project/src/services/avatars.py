@@ -0,0 +1,295 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.database.db import SessionLocal
+from fastapi_project.src.database.models import User
+from fastapi_project.src.repository import users as repository_users
+from fastapi_project.src.services.images import ImagePipeline, InvalidImage, file_digest
+from fastapi_project.src.services.storage import StorageBackend, make_storage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Extensions kept on files stored without the image pipeline, so they are served with an image type.
+SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class AvatarUploader:
+    """
+    Stores uploaded avatars in the background.
+
+    ``enqueue`` streams the upload into the staging directory and flushes it
+    to disk in a thread, then returns; the upload to the storage backend and
+    the ``User.avatar`` update run afterwards in a pool of ``workers`` threads.
+    An upload is staged as ``<job>.upload`` with a ``<job>.json`` written last,
+    so a job is either complete on disk or not visible at all. Jobs left by a
+    stopped process and jobs whose upload failed stay staged and are resumed
+    by ``start``.
+
+    Every server worker shares the staging directory, so a job is processed
+    only by the worker holding the ``flock`` on its ``<job>.lock`` file. The
+    lock is taken before the job becomes visible and is released by the
+    operating system if the worker dies, so its jobs can be resumed by the
+    next ``start`` of any worker.
+
+    Files are stored under the SHA-256 of the upload. With a ``pipeline`` the
+    upload is checked to be an image before ``enqueue`` returns and the stored
+    files are its resized variants; an image whose variants are already
+    stored is neither processed nor uploaded again.
+    """
+
+    def __init__(self, storage: StorageBackend, session_maker: async_sessionmaker, staging_dir: str | Path,
+                 max_bytes: int, workers: int = 4, stale_seconds: float = 3600,
+                 pipeline: ImagePipeline | None = None):
+        self.storage = storage
+        self.pipeline = pipeline
+        self.session_maker = session_maker
+        self.staging_dir = Path(staging_dir)
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.stale_seconds = stale_seconds
+        self.tasks: set[asyncio.Task] = set()
+        self.queued = 0
+        self.uploaded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self._slots = asyncio.Semaphore(workers)
+        self._claims: dict[str, int] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avatar-upload")
+        return self._executor
+
+    def _too_large(self):
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                             detail=f"Avatar must not exceed {self.max_bytes} bytes")
+
+    def _claim(self, job: str) -> bool:
+        fd = os.open(self.staging_dir / f"{job}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._claims[job] = fd
+        return True
+
+    def _release(self, job: str):
+        fd = self._claims.pop(job, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _stage(self, src: BinaryIO, job: str, meta: dict) -> bool:
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        data = self.staging_dir / f"{job}.upload"
+        size = 0
+        src.seek(0)
+        with open(data, "wb") as dst:
+            while chunk := src.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if size > self.max_bytes:
+            data.unlink()
+            return False
+        if self.pipeline is not None:
+            try:
+                self.pipeline.validate(data)
+            except InvalidImage:
+                data.unlink()
+                raise
+        self._claim(job)
+        try:
+            partial = self.staging_dir / f"{job}.json.partial"
+            with open(partial, "w") as dst:
+                json.dump(meta, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(partial, self.staging_dir / f"{job}.json")
+            _fsync_dir(self.staging_dir)
+        except BaseException:
+            self._release(job)
+            raise
+        return True
+
+    async def enqueue(self, file: UploadFile, user: User) -> str:
+        """
+        Stage an uploaded avatar and schedule its upload.
+
+        Returns once the file is on disk in the staging directory; the event
+        loop is not blocked while the spooled upload is copied.
+
+        :param file: Uploaded image.
+        :type file: UploadFile
+        :param user: Owner of the avatar.
+        :type user: User
+        :raises HTTPException: 413 if the file is larger than ``max_bytes``,
+            415 if the pipeline does not accept the image.
+        :return: Job id.
+        :rtype: str
+        """
+        if file.size is not None and file.size > self.max_bytes:
+            raise self._too_large()
+        job = uuid.uuid4().hex
+        suffix = Path(file.filename or "").suffix.lower()
+        meta = {"email": user.email, "suffix": suffix if suffix in SUFFIXES else ""}
+        try:
+            staged = await asyncio.to_thread(self._stage, file.file, job, meta)
+        except InvalidImage as err:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(err))
+        if not staged:
+            raise self._too_large()
+        self._submit(job, meta)
+        return job
+
+    def _submit(self, job: str, meta: dict):
+        self.queued += 1
+        task = asyncio.create_task(self._upload(job, meta))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _store(self, pairs: list[tuple[str, Path]]):
+        for name, path in pairs:
+            self.storage.save(name, path)
+
+    async def _store_upload(self, data: Path, suffix: str):
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(self.executor, file_digest, data)
+        names = self.pipeline.names(digest) if self.pipeline is not None else [f"{digest}{suffix}"]
+        if all(await asyncio.gather(*(loop.run_in_executor(self.executor, self.storage.exists, name)
+                                      for name in names))):
+            self.deduplicated += 1
+            return self.storage.url(names[0])
+        if self.pipeline is None:
+            files = [data]
+        else:
+            files = await self.pipeline.render(data, self.staging_dir)
+        try:
+            await loop.run_in_executor(self.executor, self._store, list(zip(names, files)))
+        finally:
+            for path in files:
+                if path != data:
+                    path.unlink(missing_ok=True)
+        return self.storage.url(names[0])
+
+    def _discard(self, job: str):
+        # The lock file goes last: a worker that locks it afterwards finds no job to resume.
+        (self.staging_dir / f"{job}.json").unlink(missing_ok=True)
+        (self.staging_dir / f"{job}.upload").unlink(missing_ok=True)
+        (self.staging_dir / f"{job}.lock").unlink(missing_ok=True)
+
+    async def _upload(self, job: str, meta: dict):
+        try:
+            async with self._slots:
+                try:
+                    url = await self._store_upload(self.staging_dir / f"{job}.upload", meta.get("suffix", ""))
+                    async with self.session_maker() as db:
+                        await repository_users.update_avatar_url(meta["email"], url, db)
+                except InvalidImage:
+                    self.rejected += 1
+                    logger.warning("Avatar upload %s is not a valid image, it is discarded", job)
+                    self._discard(job)
+                    return
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Avatar upload %s failed, it stays staged until the next start", job)
+                    return
+            self._discard(job)
+            self.uploaded += 1
+        finally:
+            self._release(job)
+
+    def start(self):
+        """
+        Resume the staged uploads no other worker holds and remove files of
+        stagings that never completed.
+
+        :return: Number of resumed uploads.
+        :rtype: int
+        """
+        if not self.staging_dir.is_dir():
+            return 0
+        resumed = 0
+        for path in sorted(self.staging_dir.glob("*.json")):
+            job = path.stem
+            if job in self._claims or not self._claim(job):
+                continue
+            if not path.exists():
+                # Finished by the worker that held it while this one was waiting to look.
+                (self.staging_dir / f"{job}.lock").unlink(missing_ok=True)
+                self._release(job)
+                continue
+            self._submit(job, json.loads(path.read_text()))
+            resumed += 1
+        cutoff = time.time() - self.stale_seconds
+        for path in self.staging_dir.iterdir():
+            job = path.name.split(".", 1)[0]
+            if not (self.staging_dir / f"{job}.json").exists() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        return resumed
+
+    async def stop(self):
+        """
+        Cancel the running uploads, they are resumed by the next ``start``.
+        """
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for job in list(self._claims):
+            self._release(job)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.pipeline is not None:
+            self.pipeline.shutdown()
+
+    def stats(self):
+        """
+        :return: Upload counters.
+        :rtype: dict
+        """
+        return {
+            "queued": self.queued,
+            "in_flight": len(self.tasks),
+            "uploaded": self.uploaded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "deduplicated": self.deduplicated,
+        }
+
+
+avatar_uploader = AvatarUploader(
+    make_storage(config.AVATAR_STORAGE, config.AVATAR_PROCESSING),
+    SessionLocal,
+    config.AVATAR_STAGING_DIR,
+    config.AVATAR_MAX_BYTES,
+    config.AVATAR_UPLOAD_WORKERS,
+    pipeline=ImagePipeline(config.AVATAR_SIZES, config.AVATAR_FORMAT, config.AVATAR_QUALITY,
+                           config.AVATAR_MAX_PIXELS, config.AVATAR_PROCESS_WORKERS)
+    if config.AVATAR_PROCESSING == "local" else None,
+)
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded in-process cache with least-recently-used eviction and a per-entry TTL.
+
+    Entries live ``ttl`` seconds unless ``set`` is given a shorter lifetime.
+    Expired and capacity-evicted entries are both counted as evictions.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return a cached value and mark it as recently used.
+
+        :param key: Cache key.
+        :return: The value, or None if it is missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        :param key: Cache key.
+        :param value: Value to cache.
+        :param ttl: Lifetime in seconds, capped at the cache TTL.
+        :type ttl: float, optional
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        """
+        Remove an entry if present.
+
+        :param key: Cache key.
+        :return: True if an entry was removed.
+        :rtype: bool
+        """
+        if self._data.pop(key, None) is None:
+            return False
+        self.evictions += 1
+        return True
+
+    def clear(self):
+        """
+        Remove all entries, counting them as evictions.
+        """
+        self.evictions += len(self._data)
+        self._data.clear()
+
+    def stats(self):
+        """
+        :return: Size and hit, miss and eviction counters.
+        :rtype: dict
+        """
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,236 @@
+import codecs
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi_project.src.database.models import Contact, User
+from fastapi_project.src.repository import contacts as repositories_contacts
+from fastapi_project.src.schemas import ContactSchema, ContactResponseSchema, ImportReportSchema, ImportErrorSchema
+
+CSV = "text/csv"
+NDJSON = "application/x-ndjson"
+IMPORT_FORMATS = (CSV, NDJSON)
+MAX_REPORTED_ERRORS = 1000
+EXPORT_FIELDS = tuple(ContactResponseSchema.model_fields)
+EXPORT_MEDIA_TYPES = {"ndjson": NDJSON, "csv": CSV}
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]):
+    """
+    Split a stream of UTF-8 bytes into lines without buffering the whole body.
+
+    :param chunks: Body chunks, e.g. ``Request.stream()``.
+    :type chunks: AsyncIterator[bytes]
+    :return: Async iterator of lines with their line endings.
+    :rtype: AsyncIterator[str]
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_csv_records(lines: AsyncIterator[str]):
+    """
+    Parse CSV lines into dicts keyed by the header row.
+
+    A record continues on the next line while it has an open quoted field.
+
+    :param lines: Async iterator of lines.
+    :type lines: AsyncIterator[str]
+    :return: Async iterator of ``(row number, record)``; a record is a dict or an error message.
+    :rtype: AsyncIterator[tuple[int, dict | str]]
+    """
+    header = None
+    row = 0
+    pending = ""
+    async for line in lines:
+        pending += line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row, dict(zip(header, values))
+    if pending.strip():
+        yield row + 1, "Unterminated quoted field"
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]):
+    """
+    Parse NDJSON lines into dicts, skipping blank lines.
+
+    :param lines: Async iterator of lines.
+    :type lines: AsyncIterator[str]
+    :return: Async iterator of ``(row number, record)``; a record is a dict or an error message.
+    :rtype: AsyncIterator[tuple[int, dict | str]]
+    """
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except ValueError as err:
+            yield row, f"Invalid JSON: {err}"
+            continue
+        yield row, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _add_error(report: ImportReportSchema, row: int, detail: str):
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(ImportErrorSchema(row=row, detail=detail))
+
+
+async def _flush(batch: list, report: ImportReportSchema, db: AsyncSession, user: User):
+    unique_rows = []
+    seen = set()
+    for row, body in batch:
+        keys = {("email", repositories_contacts.normalize_email(body.email)),
+                ("phone_number", repositories_contacts.normalize_phone(body.phone_number))} - {("phone_number", None)}
+        if keys & seen:
+            _add_error(report, row, "Duplicate email or phone number in upload")
+            continue
+        seen |= keys
+        unique_rows.append((row, body))
+    if not unique_rows:
+        return
+    inserted = await repositories_contacts.create_contacts_bulk([body for _, body in unique_rows], db, user)
+    for row, body in unique_rows:
+        if body.email in inserted:
+            report.imported += 1
+        else:
+            _add_error(report, row, "Contact with this email or phone number already exists")
+
+
+async def import_contacts(chunks: AsyncIterator[bytes], content_type: str, chunk_size: int,
+                          db: AsyncSession, user: User):
+    """
+    Validate and insert contacts from a streamed CSV or NDJSON body.
+
+    Rows are validated with ``ContactSchema`` and inserted in batches of
+    ``chunk_size``, each batch in its own transaction.
+
+    :param chunks: Body chunks, e.g. ``Request.stream()``.
+    :type chunks: AsyncIterator[bytes]
+    :param content_type: ``text/csv`` or ``application/x-ndjson``.
+    :type content_type: str
+    :param chunk_size: Number of rows per INSERT and transaction.
+    :type chunk_size: int
+    :param db: Async SQLAlchemy session.
+    :type db: AsyncSession
+    :param user: The user who owns the imported contacts.
+    :type user: User
+    :return: Number of imported and failed rows with per-row errors (at most ``MAX_REPORTED_ERRORS``).
+    :rtype: ImportReportSchema
+    """
+    parse = iter_csv_records if content_type == CSV else iter_ndjson_records
+    report = ImportReportSchema()
+    batch = []
+    async for row, record in parse(iter_lines(chunks)):
+        if isinstance(record, str):
+            _add_error(report, row, record)
+            continue
+        try:
+            batch.append((row, ContactSchema.model_validate(record)))
+        except ValidationError as err:
+            _add_error(report, row, "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in err.errors()
+            ))
+            continue
+        if len(batch) >= chunk_size:
+            await _flush(batch, report, db, user)
+            batch = []
+    if batch:
+        await _flush(batch, report, db, user)
+    report.errors.sort(key=lambda error: error.row)
+    return report
+
+
+def _export_values(contact: Contact):
+    values = [getattr(contact, field) for field in EXPORT_FIELDS]
+    return [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+
+
+async def _encode_contacts(contacts: AsyncIterator[Contact], export_format: str):
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        first = True
+        async for contact in contacts:
+            writer.writerow(_export_values(contact))
+            if first or buffer.tell() >= EXPORT_BUFFER_SIZE:
+                first = False
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+    else:
+        lines = []
+        size = 0
+        first = True
+        async for contact in contacts:
+            line = json.dumps(dict(zip(EXPORT_FIELDS, _export_values(contact))), separators=(",", ":")) + "\n"
+            lines.append(line)
+            size += len(line)
+            if first or size >= EXPORT_BUFFER_SIZE:
+                first = False
+                yield "".join(lines).encode()
+                lines = []
+                size = 0
+        yield "".join(lines).encode()
+
+
+async def export_contacts(contacts: AsyncIterator[Contact], export_format: str, compress: bool = False):
+    """
+    Encode a stream of contacts as NDJSON or CSV, optionally gzip-compressed.
+
+    The header and the first contact are sent at once, so the client sees the
+    export start without waiting for a full buffer; after that output is
+    produced in chunks of about ``EXPORT_BUFFER_SIZE`` bytes, so memory use
+    does not depend on the number of contacts. Compressed output is flushed
+    at the end of every chunk.
+
+    :param contacts: Async iterator of contacts, e.g. from ``repository.contacts.stream_contacts``.
+    :type contacts: AsyncIterator[Contact]
+    :param export_format: ``ndjson`` or ``csv``.
+    :type export_format: str
+    :param compress: Whether to gzip the output.
+    :type compress: bool
+    :return: Async iterator of encoded chunks.
+    :rtype: AsyncIterator[bytes]
+    """
+    if not compress:
+        async for chunk in _encode_contacts(contacts, export_format):
+            if chunk:
+                yield chunk
+        return
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in _encode_contacts(contacts, export_format):
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -1,9 +1,11 @@
-from pathlib import Path
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from fastapi_mail import ConnectionConfig
 from pydantic import EmailStr
 from fastapi_project.src.conf.config import config
 from fastapi_project.src.services.auth import auth_service
+from fastapi_project.src.services.mail_transport import SMTPPool
+from fastapi_project.src.services.templating import TEMPLATE_DIR, template_service
 
 conf = ConnectionConfig(
     MAIL_USERNAME=config.MAIL_USERNAME,
@@ -12,70 +14,82 @@ conf = ConnectionConfig(
     MAIL_PORT=config.MAIL_PORT,
     MAIL_SERVER=config.MAIL_SERVER,
     MAIL_FROM_NAME=config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    MAIL_STARTTLS=config.MAIL_STARTTLS,
+    MAIL_SSL_TLS=config.MAIL_SSL_TLS,
+    USE_CREDENTIALS=config.MAIL_USE_CREDENTIALS,
+    VALIDATE_CERTS=config.MAIL_VALIDATE_CERTS,
+    TEMPLATE_FOLDER=TEMPLATE_DIR,
 )
 
+mail_transport = SMTPPool(conf, config.MAIL_POOL_SIZE, config.MAIL_SESSION_MAX_MESSAGES, config.MAIL_IDLE_TIMEOUT)
 
-async def send_email(email: EmailStr, username: str, host: str):
-    """
-    Sends a confirmation email to the user.
 
-    This function sends an email with a verification token and a confirmation
-    link to the specified email address.
+# Subject and template of every kind of email that can be queued in the outbox.
+EMAIL_KINDS = {
+    "confirm": ("Confirm your email ", "email_template.html"),
+    "reset": ("Reset your email ", "email_rp_template.html"),
+}
+
 
+def build_message(kind: str, email: EmailStr, username: str, host: str):
+    """
+    Render an email of one of the ``EMAIL_KINDS`` with a fresh verification token.
+
+    :param kind: Kind of email, a key of ``EMAIL_KINDS``.
+    :type kind: str
     :param email: Email address of the recipient.
     :type email: EmailStr
     :param username: Username of the recipient.
     :type username: str
-    :param host: Base URL or domain to be used in the confirmation link.
+    :param host: Base URL or domain to be used in the link.
     :type host: str
-    :raises ConnectionErrors: If sending the email fails due to a connection issue.
+    :return: MIME message ready to be sent.
+    :rtype: EmailMessage
     """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
+    subject, template_name = EMAIL_KINDS[kind]
+    token_verification = auth_service.create_email_token({"sub": email})
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = formataddr((conf.MAIL_FROM_NAME, conf.MAIL_FROM))
+    message["To"] = email
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid()
+    message.set_content(
+        template_service.render_fields(template_name, host=host, username=username, token=token_verification),
+        subtype="html",
+    )
+    return message
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
 
-async def send_rp_email(email: EmailStr, username: str, host: str):
+async def deliver(kind: str, email: EmailStr, username: str, host: str):
     """
-    Sends a password reset email to the user.
-
-    This function sends an email containing a reset token and a link to reset
-    the password.
+    Send an email of one of the ``EMAIL_KINDS`` over a pooled SMTP session.
 
+    :param kind: Kind of email, a key of ``EMAIL_KINDS``.
+    :type kind: str
     :param email: Email address of the recipient.
     :type email: EmailStr
     :param username: Username of the recipient.
     :type username: str
-    :param host: Base URL or domain to be used in the reset link.
+    :param host: Base URL or domain to be used in the link.
     :type host: str
     :raises ConnectionErrors: If sending the email fails due to a connection issue.
+    :raises SMTPResponseException: If the server rejects the email.
     """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Reset your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
+    error, = await mail_transport.send([build_message(kind, email, username, host)])
+    if error is not None:
+        raise error
+
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_rp_template.html")
-    except ConnectionErrors as err:
-        print(err)
+async def deliver_many(emails: list[tuple[str, EmailStr, str, str]]):
+    """
+    Send many emails, spreading them over the pooled SMTP sessions.
 
+    :param emails: ``(kind, email, username, host)`` of every email.
+    :type emails: list[tuple[str, EmailStr, str, str]]
+    :return: For each email the error that prevented sending it, or None.
+    :rtype: list[Exception | None]
+    """
+    messages = [build_message(*email) for email in emails]
+    return await mail_transport.send_many(messages)
 
@@ -0,0 +1,42 @@
+from fastapi import Response, status
+
+
+def make_etag(value):
+    """
+    Build a strong entity tag.
+
+    :param value: Version or digest identifying the representation.
+    :return: Quoted entity tag.
+    :rtype: str
+    """
+    return f'"{value}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str):
+    """
+    Check an ``If-None-Match`` header against the current entity tag.
+
+    Uses the weak comparison that RFC 9110 prescribes for ``If-None-Match``.
+
+    :param if_none_match: Value of the ``If-None-Match`` header.
+    :type if_none_match: str, optional
+    :param etag: Current entity tag from ``make_etag``.
+    :type etag: str
+    :return: True if the client already has the current representation.
+    :rtype: bool
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str):
+    """
+    :param etag: Current entity tag.
+    :type etag: str
+    :return: Empty ``304 Not Modified`` response carrying the entity tag.
+    :rtype: Response
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
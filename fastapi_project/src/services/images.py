@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is only needed with AVATAR_PROCESSING=local
+    Image = ImageOps = None
+
+FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+class InvalidImage(ValueError):
+    """
+    The upload is not an image the pipeline accepts.
+    """
+
+
+def file_digest(path: Path) -> str:
+    """
+    :param path: File to hash.
+    :type path: Path
+    :return: Hex SHA-256 of the file content.
+    :rtype: str
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def probe(path: Path, max_pixels: int):
+    """
+    Check the image header without decoding the pixels.
+
+    :param path: Image file.
+    :type path: Path
+    :param max_pixels: Largest accepted width times height.
+    :type max_pixels: int
+    :raises InvalidImage: If the file is not a JPEG, PNG, WebP or GIF image or is too large.
+    :return: Format, width and height.
+    :rtype: tuple[str, int, int]
+    """
+    try:
+        with Image.open(path) as image:
+            kind, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError) as err:
+        raise InvalidImage("File is not a supported image") from err
+    if kind not in FORMATS:
+        raise InvalidImage(f"Unsupported image format {kind}, use one of {', '.join(sorted(FORMATS))}")
+    if width * height > max_pixels:
+        raise InvalidImage(f"Image must not exceed {max_pixels} pixels")
+    return kind, width, height
+
+
+def render_variants(path: Path, out_dir: Path, sizes: tuple[int, ...], fmt: str, quality: int,
+                    max_pixels: int) -> list[Path]:
+    """
+    Decode an image and write a square crop of it per size.
+
+    Runs in a worker process. JPEGs are decoded at the smallest scale that
+    still covers the largest size, the EXIF orientation is applied, and the
+    image is center-cropped and resized with Lanczos.
+
+    :param path: Source image.
+    :type path: Path
+    :param out_dir: Directory for the variants, named ``<source stem>.<size>.<extension>``.
+    :type out_dir: Path
+    :param sizes: Edge lengths of the variants in pixels.
+    :type sizes: tuple[int, ...]
+    :param fmt: ``webp`` or ``jpeg``.
+    :type fmt: str
+    :param quality: Encoder quality, 1-100.
+    :type quality: int
+    :param max_pixels: Largest accepted width times height.
+    :type max_pixels: int
+    :raises InvalidImage: If the image cannot be decoded.
+    :return: Variant files in the order of ``sizes``.
+    :rtype: list[Path]
+    """
+    probe(path, max_pixels)
+    mode = "RGBA" if fmt == "webp" else "RGB"
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", (max(sizes), max(sizes)))
+            image = ImageOps.exif_transpose(image).convert(mode)
+    except (OSError, SyntaxError) as err:
+        raise InvalidImage("Image is corrupt") from err
+    out = []
+    for size in sizes:
+        target = out_dir / f"{path.stem}.{size}.{EXTENSIONS[fmt]}"
+        variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variant.save(target, fmt.upper(), quality=quality)
+        out.append(target)
+    return out
+
+
+class ImagePipeline:
+    """
+    Resizes and re-encodes avatars in a process pool.
+
+    Every upload becomes one square image per size in ``sizes``; the first
+    size is the one ``User.avatar`` points at. Variants are named after the
+    SHA-256 of the source file, so they never change once stored and the same
+    image uploaded again is not processed again.
+    """
+
+    def __init__(self, sizes: list[int], fmt: str = "webp", quality: int = 80,
+                 max_pixels: int = 25_000_000, workers: int = 2):
+        if Image is None:
+            raise RuntimeError("AVATAR_PROCESSING=local requires Pillow, install the `images` extra")
+        self.sizes = tuple(sizes)
+        self.fmt = fmt
+        self.quality = quality
+        self.max_pixels = max_pixels
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # The app process runs executor threads; forking it could copy a held lock into the workers.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("forkserver"))
+        return self._executor
+
+    def names(self, digest: str):
+        """
+        :param digest: SHA-256 of the source image.
+        :type digest: str
+        :return: Storage names of the variants in the order of ``sizes``.
+        :rtype: list[str]
+        """
+        return [f"{digest}/{size}.{EXTENSIONS[self.fmt]}" for size in self.sizes]
+
+    def validate(self, path: Path):
+        """
+        Reject a file that is not a supported image from its header. Blocking.
+
+        :param path: Uploaded file.
+        :type path: Path
+        :raises InvalidImage: If the image is not accepted.
+        """
+        probe(path, self.max_pixels)
+
+    async def render(self, path: Path, out_dir: Path):
+        """
+        Render the variants of an image in the process pool.
+
+        :param path: Source image.
+        :type path: Path
+        :param out_dir: Directory for the variant files.
+        :type out_dir: Path
+        :raises InvalidImage: If the image cannot be decoded.
+        :return: Variant files in the order of ``sizes``.
+        :rtype: list[Path]
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, render_variants, path, out_dir, self.sizes, self.fmt, self.quality, self.max_pixels
+        )
+
+    def shutdown(self):
+        """
+        Shut down the process pool, it is recreated on next use.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
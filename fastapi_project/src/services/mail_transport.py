@@ -0,0 +1,226 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from fastapi_mail.errors import ConnectionErrors
+
+
+class PooledSession:
+    """
+    An SMTP connection owned by ``SMTPPool`` with its usage counters.
+    """
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.idle_since = time.monotonic()
+        self.broken = False
+        self.reused = False
+
+
+class SMTPPool:
+    """
+    Bounded pool of connected and authenticated SMTP sessions.
+
+    At most ``size`` sessions are open at a time; further senders wait for a
+    free one. A session is reused until it has sent ``max_messages`` messages
+    or has been idle for ``idle_timeout`` seconds, and is dropped after a
+    connection error. A reused session that the server has already closed is
+    replaced by a new connection before its first message fails. With
+    ``SUPPRESS_SEND`` in the configuration nothing is sent.
+    """
+
+    def __init__(self, config: ConnectionConfig, size: int = 4, max_messages: int = 100, idle_timeout: float = 30):
+        self.config = config
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._idle: list[PooledSession] = []
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+        self.reuses = 0
+        self.sent = 0
+        self.failed = 0
+        self.send_seconds = 0.0
+        self.send_seconds_max = 0.0
+        self.first_send_at: float | None = None
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            timeout=self.config.TIMEOUT,
+            port=self.config.MAIL_PORT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            local_hostname=self.config.LOCAL_HOSTNAME,
+            cert_bundle=self.config.CERT_BUNDLE,
+        )
+        try:
+            await smtp.connect()
+            if self.config.USE_CREDENTIALS:
+                await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        except Exception as error:
+            smtp.close()
+            raise ConnectionErrors(
+                f"Exception raised {error}, check your credentials or email service configuration"
+            ) from error
+        self.connects += 1
+        return PooledSession(smtp)
+
+    @staticmethod
+    async def _close(session: PooledSession):
+        try:
+            await session.smtp.quit()
+        except Exception:
+            session.smtp.close()
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Borrow a session, reusing an idle one when possible.
+
+        :return: Async context manager yielding a connected session.
+        :rtype: AsyncContextManager[PooledSession]
+        :raises ConnectionErrors: If a new session cannot connect or log in.
+        """
+        async with self._slots:
+            session = None
+            while self._idle and session is None:
+                candidate = self._idle.pop()
+                if candidate.smtp.is_connected and time.monotonic() - candidate.idle_since < self.idle_timeout:
+                    session = candidate
+                    session.reused = True
+                    self.reuses += 1
+                else:
+                    await self._close(candidate)
+            if session is None:
+                session = await self._connect()
+            try:
+                yield session
+            except BaseException:
+                session.smtp.close()
+                raise
+            if session.broken or session.sent >= self.max_messages:
+                await self._close(session)
+            else:
+                session.idle_since = time.monotonic()
+                self._idle.append(session)
+
+    def _record(self, seconds: float, error: Exception | None):
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.send_seconds += seconds
+        self.send_seconds_max = max(self.send_seconds_max, seconds)
+
+    async def _send_message(self, session: PooledSession, message: Message, retry: bool):
+        try:
+            await session.smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            if not retry:
+                raise
+            # The server closed the idle connection before the client noticed; try once more on a new one.
+            session.smtp.close()
+            session.smtp = (await self._connect()).smtp
+            session.reused = False
+            await session.smtp.send_message(message)
+
+    async def _send_session(self, messages: list[Message]):
+        results = []
+        async with self.session() as session:
+            for message in messages:
+                start = time.perf_counter()
+                try:
+                    await self._send_message(session, message, retry=session.reused and not results)
+                except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused) as error:
+                    # Rejected by the server; the session itself is still usable.
+                    results.append(error)
+                except Exception as error:
+                    session.broken = True
+                    error = ConnectionErrors(f"Exception raised {error} while sending")
+                    self._record(time.perf_counter() - start, error)
+                    # The messages after this one were not attempted and fail with it.
+                    self.failed += len(messages) - len(results) - 1
+                    results.extend([error] * (len(messages) - len(results)))
+                    break
+                else:
+                    results.append(None)
+                    session.sent += 1
+                self._record(time.perf_counter() - start, results[-1])
+        return results
+
+    async def send(self, messages: list[Message]):
+        """
+        Send messages in order over pooled sessions, ``max_messages`` per session.
+
+        A message rejected by the server does not affect the others. If a
+        reused session turns out to be disconnected, its first message is sent
+        again over a new connection; after any other connection error the
+        remaining messages of the session fail with it.
+
+        :param messages: Prepared MIME messages.
+        :type messages: list[Message]
+        :return: For each message the error that prevented sending it, or None.
+        :rtype: list[Exception | None]
+        :raises ConnectionErrors: If no session can be opened.
+        """
+        if self.first_send_at is None:
+            self.first_send_at = time.monotonic()
+        if self.config.SUPPRESS_SEND:
+            return [None] * len(messages)
+        results = []
+        for i in range(0, len(messages), self.max_messages):
+            results.extend(await self._send_session(messages[i:i + self.max_messages]))
+        return results
+
+    async def send_many(self, messages: list[Message]):
+        """
+        Send messages over up to ``size`` sessions in parallel.
+
+        :param messages: Prepared MIME messages.
+        :type messages: list[Message]
+        :return: For each message the error that prevented sending it, or None.
+        :rtype: list[Exception | None]
+        """
+        lanes = max(min(self.size, len(messages)), 1)
+        parts = await asyncio.gather(
+            *(self.send(messages[lane::lanes]) for lane in range(lanes)), return_exceptions=True
+        )
+        results = [None] * len(messages)
+        for lane, part in enumerate(parts):
+            indexes = range(lane, len(messages), lanes)
+            for index, result in zip(indexes, part if isinstance(part, list) else [part] * len(indexes)):
+                results[index] = result
+        return results
+
+    async def close(self):
+        """
+        Close all idle sessions.
+        """
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await self._close(session)
+
+    def stats(self):
+        """
+        :return: Session reuse, throughput and per-message latency counters.
+        :rtype: dict
+        """
+        attempts = self.sent + self.failed
+        elapsed = time.monotonic() - self.first_send_at if self.first_send_at is not None else 0.0
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connects": self.connects,
+            "reuses": self.reuses,
+            "sent": self.sent,
+            "failed": self.failed,
+            "messages_per_connect": self.sent / self.connects if self.connects else 0.0,
+            "messages_per_second": self.sent / elapsed if elapsed else 0.0,
+            "send_ms_avg": self.send_seconds / attempts * 1000 if attempts else 0.0,
+            "send_ms_max": self.send_seconds_max * 1000,
+        }
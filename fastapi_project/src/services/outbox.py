@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from fastapi_project.src.database.models import EmailOutbox
+from fastapi_project.src.repository import outbox as repository_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """
+    Sends the emails queued in the outbox.
+
+    Each round claims up to ``concurrency`` due emails, sends them concurrently
+    and records the results. A failed email is retried after
+    ``backoff_base * 2 ** (attempts - 1)`` seconds, at most ``backoff_max``, and
+    marked as failed after ``max_attempts`` attempts. Claims are leases, so the
+    emails of a worker that stops while sending are sent again by another one.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker, send: Callable[[EmailOutbox], Awaitable[None]],
+                 concurrency: int = 10, max_attempts: int = 5, backoff_base: float = 30,
+                 backoff_max: float = 3600, lease_seconds: float = 300, poll_interval: float = 1):
+        self.session_maker = session_maker
+        self.send = send
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def backoff(self, attempts: int):
+        """
+        :param attempts: Number of attempts made so far.
+        :type attempts: int
+        :return: Delay before the next attempt in seconds.
+        :rtype: float
+        """
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    async def _send(self, email: EmailOutbox):
+        try:
+            await self.send(email)
+        except Exception as err:
+            return err
+        return None
+
+    async def run_once(self):
+        """
+        Claim, send and record one round of due emails.
+
+        :return: Number of emails attempted.
+        :rtype: int
+        """
+        async with self.session_maker() as db:
+            emails = await repository_outbox.claim_emails(self.concurrency, self.lease_seconds, db)
+        if not emails:
+            return 0
+        errors = await asyncio.gather(*(self._send(email) for email in emails))
+        async with self.session_maker() as db:
+            await repository_outbox.complete_emails([email.id for email, err in zip(emails, errors) if err is None], db)
+            for email, err in zip(emails, errors):
+                if err is None:
+                    self.sent += 1
+                    continue
+                retry_at = None
+                if email.attempts < self.max_attempts:
+                    retry_at = repository_outbox.utcnow() + timedelta(seconds=self.backoff(email.attempts))
+                    self.retried += 1
+                else:
+                    self.failed += 1
+                logger.warning("Sending %s email %s failed (attempt %s): %r", email.kind, email.id, email.attempts, err)
+                await repository_outbox.fail_email(email.id, repr(err), retry_at, db)
+        return len(emails)
+
+    async def run(self, stop: asyncio.Event | None = None):
+        """
+        Send emails until ``stop`` is set, polling every ``poll_interval`` seconds while the outbox is idle.
+
+        :param stop: Event that ends the loop after the current round.
+        :type stop: asyncio.Event, optional
+        """
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                if await self.run_once() == self.concurrency:
+                    continue
+            except Exception:
+                logger.exception("Outbox round failed")
+            try:
+                await asyncio.wait_for(stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        """
+        :return: Numbers of sent, retried and failed emails.
+        :rtype: dict
+        """
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable
+from urllib.parse import urlencode
+import redis.asyncio as redis
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.services.etag import make_etag, etag_matches
+
+GENERATION_KEY = "contacts:generation:{user_id}"
+RESPONSE_KEY = "contacts:response:{route}:{user_id}:{generation}:{digest}"
+
+
+def params_digest(params: dict):
+    """
+    Hash query parameters independently of their order and of unset values.
+
+    :param params: Query parameters of the request.
+    :type params: dict
+    :return: Hex digest of the normalized parameters.
+    :rtype: str
+    """
+    normalized = urlencode(sorted((name, str(value)) for name, value in params.items() if value is not None))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Redis cache of serialized contact list responses.
+
+    Keys contain the user's current generation. Writing a contact replaces the
+    generation with a new value, so every cached response of that user becomes
+    unreachable at once and expires on its own. A route is served from the
+    cache only if it has a positive TTL in ``routes``; without a Redis client
+    nothing is cached.
+    """
+
+    def __init__(self, routes: dict[str, int]):
+        self.routes = routes
+        self.client: redis.Redis | None = None
+        self.hits: dict[str, int] = {route: 0 for route in routes}
+        self.misses: dict[str, int] = {route: 0 for route in routes}
+
+    def start(self, client: redis.Redis):
+        """
+        Attach the shared async Redis client.
+
+        :param client: Async Redis client backed by the application connection pool.
+        :type client: redis.Redis
+        """
+        self.client = client
+
+    def stop(self):
+        """
+        Detach the Redis client.
+        """
+        self.client = None
+
+    async def generation(self, user_id: int):
+        """
+        Return the current cache generation of a user, creating it if missing.
+
+        New generations are nanosecond timestamps rather than counters starting
+        at zero, so a generation key evicted by Redis cannot bring back
+        responses cached under an earlier value.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        :return: Opaque generation value.
+        :rtype: str
+        """
+        key = GENERATION_KEY.format(user_id=user_id)
+        generation = await self.client.get(key)
+        if generation is None:
+            await self.client.set(key, time.time_ns(), nx=True)
+            generation = await self.client.get(key)
+        return generation.decode() if isinstance(generation, bytes) else str(generation)
+
+    async def bump(self, user_id: int):
+        """
+        Make all cached responses of a user unreachable.
+
+        :param user_id: ID of the user whose contacts changed.
+        :type user_id: int
+        """
+        if self.client is not None:
+            await self.client.set(GENERATION_KEY.format(user_id=user_id), time.time_ns())
+
+    async def serve(self, route: str, user_id: int, params: dict,
+                    load: Callable[[], Awaitable[tuple[bytes, dict]]], if_none_match: str | None = None):
+        """
+        Return a cached response, or load, cache and return a fresh one.
+
+        Every response carries an ``ETag``. With a Redis client it is derived
+        from the user's generation and ``params``, so a matching
+        ``If-None-Match`` is answered without loading or serializing anything;
+        otherwise it is a digest of the loaded body.
+
+        :param route: Route name, a key of ``routes``.
+        :type route: str
+        :param user_id: ID of the user the response belongs to.
+        :type user_id: int
+        :param params: Query parameters that select the response.
+        :type params: dict
+        :param load: Coroutine function returning the JSON body and response headers.
+        :type load: Callable[[], Awaitable[tuple[bytes, dict]]]
+        :param if_none_match: Value of the request's ``If-None-Match`` header.
+        :type if_none_match: str, optional
+        :return: JSON body, or None if the client's copy is current, and response headers.
+        :rtype: tuple[bytes | None, dict]
+        """
+        if self.client is None:
+            body, headers = await load()
+            etag = make_etag(hashlib.sha256(body).hexdigest()[:32])
+            if etag_matches(if_none_match, etag):
+                return None, {"ETag": etag}
+            return body, {**headers, "ETag": etag}
+        generation = await self.generation(user_id)
+        digest = params_digest(params)
+        etag = make_etag(f"{route}.{generation}.{digest[:16]}")
+        if etag_matches(if_none_match, etag):
+            return None, {"ETag": etag}
+        ttl = self.routes.get(route, 0)
+        if ttl <= 0:
+            body, headers = await load()
+            return body, {**headers, "ETag": etag}
+        key = RESPONSE_KEY.format(route=route, user_id=user_id, generation=generation, digest=digest)
+        cached = await self.client.get(key)
+        if cached is not None:
+            self.hits[route] += 1
+            headers, body = cached.split(b"\n", 1)
+            return body, {**json.loads(headers), "ETag": etag}
+        self.misses[route] += 1
+        body, headers = await load()
+        await self.client.set(key, json.dumps(headers).encode() + b"\n" + body, ex=ttl)
+        return body, {**headers, "ETag": etag}
+
+    def stats(self):
+        """
+        :return: Hits, misses and hit ratio of every cached route.
+        :rtype: dict
+        """
+        stats = {}
+        for route in self.routes:
+            hits, misses = self.hits.get(route, 0), self.misses.get(route, 0)
+            stats[route] = {"hits": hits, "misses": misses,
+                            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+        return stats
+
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_ROUTES)
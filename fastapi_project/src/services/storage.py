@@ -0,0 +1,151 @@
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+import cloudinary
+import cloudinary.uploader
+from fastapi.staticfiles import StaticFiles
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.services.cache import LRUCache
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded avatars are stored.
+
+    Names are content hashes, so a stored file never changes. The methods are
+    blocking and run in the avatar upload executor, never on the event loop.
+    """
+
+    @abstractmethod
+    def save(self, name: str, path: Path) -> str:
+        """
+        Store a file under a name.
+
+        :param name: Name of the stored file.
+        :type name: str
+        :param path: Local file to store.
+        :type path: Path
+        :return: Public URL of the stored file.
+        :rtype: str
+        """
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """
+        :param name: Name of a stored file.
+        :type name: str
+        :return: True if a file is stored under the name.
+        :rtype: bool
+        """
+
+    @abstractmethod
+    def url(self, name: str) -> str:
+        """
+        :param name: Name of a stored file.
+        :type name: str
+        :return: Public URL of the file.
+        :rtype: str
+        """
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores files in a local directory served at ``base_url``.
+
+    Files are written to a temporary name, flushed to disk and renamed, so a
+    reader never sees a partial file.
+    """
+
+    def __init__(self, root: str | Path, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def save(self, name: str, path: Path) -> str:
+        target = self.root / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.partial")
+        with open(path, "rb") as src, open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(partial, target)
+        return self.url(name)
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}{name}"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Serves ``LocalStorage`` files with a one-year ``Cache-Control``, their content never changes.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Uploads files to Cloudinary.
+
+    URLs apply ``transformation``, e.g. a 250x250 crop, when images are
+    resized by Cloudinary instead of by the local image pipeline.
+
+    ``exists`` never calls the rate-limited Admin API: it only knows the
+    names this process has stored, up to ``known_size`` of them. Any other
+    file is uploaded again, which is harmless because the public ID is
+    derived from the content hash and the upload overwrites it.
+    """
+
+    def __init__(self, folder: str = "Web16", transformation: dict | None = None, known_size: int = 4096):
+        self.folder = folder
+        self.transformation = transformation or {}
+        self._known = LRUCache(known_size, float("inf"))
+        self._lock = threading.Lock()
+        cloudinary.config(
+            cloud_name=config.CLOUDINARY_NAME,
+            api_key=config.CLOUDINARY_API_KEY,
+            api_secret=config.CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+
+    def public_id(self, name: str):
+        return f"{self.folder}/{name.rsplit('.', 1)[0]}"
+
+    def save(self, name: str, path: Path) -> str:
+        cloudinary.uploader.upload(str(path), public_id=self.public_id(name), overwrite=True)
+        with self._lock:
+            self._known.set(name, True)
+        return self.url(name)
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return self._known.get(name) is not None
+
+    def url(self, name: str) -> str:
+        return cloudinary.CloudinaryImage(self.public_id(name)).build_url(**self.transformation)
+
+
+def make_storage(kind: str, processing: str) -> StorageBackend:
+    """
+    Create the storage backend selected by ``AVATAR_STORAGE``.
+
+    :param kind: ``cloudinary`` or ``local``.
+    :type kind: str
+    :param processing: ``cloudinary`` to let Cloudinary resize the avatars, or ``local``.
+    :type processing: str
+    :return: Storage backend.
+    :rtype: StorageBackend
+    """
+    if kind == "local":
+        return LocalStorage(config.AVATAR_LOCAL_DIR, config.AVATAR_LOCAL_URL)
+    if processing == "cloudinary":
+        return CloudinaryStorage(transformation={"width": 250, "height": 250, "crop": "fill"})
+    return CloudinaryStorage()
@@ -0,0 +1,130 @@
+import re
+from pathlib import Path
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from markupsafe import escape
+from fastapi_project.src.conf.config import config
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+# Stand-ins rendered in place of the per-message values; NUL never occurs in the templates.
+_SLOT = "\x00{}\x00"
+_SLOT_PATTERN = re.compile("\x00([A-Za-z_][A-Za-z0-9_]*)\x00")
+_PROBE = "probe<&>'\""
+
+
+class PrerenderedTemplate:
+    """
+    A template rendered once with its variables left as slots.
+
+    Rendering joins the static parts with the escaped values, which gives the
+    same output as the template as long as the variables are only
+    interpolated, not tested, looped over or filtered.
+    """
+
+    def __init__(self, template: Template, fields: tuple[str, ...], autoescape: bool):
+        self.fields = fields
+        self.autoescape = autoescape
+        parts = _SLOT_PATTERN.split(template.render({field: _SLOT.format(field) for field in fields}))
+        self.static = parts[0::2]
+        self.slots = parts[1::2]
+
+    def render(self, **values):
+        """
+        :param values: Value of every field.
+        :return: Rendered template.
+        :rtype: str
+        """
+        if self.autoescape:
+            values = {name: escape(value) for name, value in values.items()}
+        out = [self.static[0]]
+        for slot, static in zip(self.slots, self.static[1:]):
+            out.append(str(values[slot]))
+            out.append(static)
+        return "".join(out)
+
+
+class TemplateService:
+    """
+    Shared Jinja2 environment for email bodies and HTML pages.
+
+    Templates are compiled once and never re-checked on disk; with a
+    ``bytecode_cache_dir`` the compiled code is also reused across processes
+    and restarts. HTML templates are autoescaped. ``templates`` wraps the same
+    environment for ``TemplateResponse`` in routes.
+    """
+
+    def __init__(self, directory: Path, bytecode_cache_dir: str | None = None):
+        if bytecode_cache_dir:
+            Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir) if bytecode_cache_dir else None,
+        )
+        self.templates = Jinja2Templates(env=self.env)
+        self._prerendered: dict[tuple[str, tuple[str, ...]], PrerenderedTemplate | None] = {}
+
+    def preload(self):
+        """
+        Compile every template in the template directory.
+        """
+        for name in self.env.list_templates():
+            self.env.get_template(name)
+
+    def render(self, name: str, **context):
+        """
+        Render a template in full.
+
+        :param name: Template file name.
+        :type name: str
+        :param context: Template variables.
+        :return: Rendered template.
+        :rtype: str
+        """
+        return self.env.get_template(name).render(**context)
+
+    def prerendered(self, name: str, fields: tuple[str, ...]):
+        """
+        Return the prerendered form of a template, building it on first use.
+
+        The prerendered output is checked against full renders with probe and
+        with empty values; a template whose output depends on its variables in
+        other ways than interpolation gets None and is always rendered in full.
+
+        :param name: Template file name.
+        :type name: str
+        :param fields: Names of the per-message variables.
+        :type fields: tuple[str, ...]
+        :return: Prerendered template, or None if it cannot be prerendered.
+        :rtype: PrerenderedTemplate or None
+        """
+        key = (name, fields)
+        if key not in self._prerendered:
+            template = self.env.get_template(name)
+            prerendered = PrerenderedTemplate(template, fields, self.env.autoescape(name))
+            probes = ({field: f"{_PROBE}{field}" for field in fields}, dict.fromkeys(fields, ""))
+            exact = set(prerendered.slots) <= set(fields) and all(
+                prerendered.render(**probe) == template.render(**probe) for probe in probes
+            )
+            self._prerendered[key] = prerendered if exact else None
+        return self._prerendered[key]
+
+    def render_fields(self, name: str, **values):
+        """
+        Render a template whose static parts are rendered once and reused.
+
+        :param name: Template file name.
+        :type name: str
+        :param values: Per-message variables.
+        :return: Rendered template.
+        :rtype: str
+        """
+        prerendered = self.prerendered(name, tuple(sorted(values)))
+        if prerendered is None:
+            return self.render(name, **values)
+        return prerendered.render(**values)
+
+
+template_service = TemplateService(TEMPLATE_DIR, config.TEMPLATE_BYTECODE_CACHE_DIR)
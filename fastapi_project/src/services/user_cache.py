@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+import redis.asyncio as redis
+from fastapi_project.src.conf.config import config
+from fastapi_project.src.database.models import User
+from fastapi_project.src.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_VERSION = 2
+INVALIDATION_CHANNEL = "user-cache:invalidate"
+
+
+@dataclass(slots=True)
+class CachedUser:
+    """
+    Detached, read-only view of a user restored from the cache.
+
+    It carries only the fields that authorization and ``UserResponse`` need and
+    is never attached to a database session.
+    """
+    id: int
+    username: str | None
+    email: str
+    avatar: str | None
+    confirmed: bool | None
+    version: int
+
+
+USER_CACHE_FIELDS = CachedUser.__slots__
+
+
+def serialize_user(user: User | CachedUser):
+    """
+    Serialize the fields of a user needed for authorization into a cache record.
+
+    :param user: The user to serialize.
+    :type user: User or CachedUser
+    :return: Compact JSON record tagged with ``USER_CACHE_VERSION``.
+    :rtype: bytes
+    """
+    record = [USER_CACHE_VERSION, *(getattr(user, field) for field in USER_CACHE_FIELDS)]
+    return json.dumps(record, separators=(",", ":")).encode()
+
+
+def deserialize_user(data: bytes):
+    """
+    Build a ``CachedUser`` from a cache record.
+
+    Records with another schema version or an unknown format are treated as a cache miss.
+
+    :param data: Cache record produced by ``serialize_user``.
+    :type data: bytes
+    :return: Cached user, or None if the record cannot be used.
+    :rtype: CachedUser or None
+    """
+    try:
+        record = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(record, list) or len(record) != len(USER_CACHE_FIELDS) + 1 or record[0] != USER_CACHE_VERSION:
+        return None
+    return CachedUser(*record[1:])
+
+
+class UserCache:
+    """
+    Two-tier user cache: an in-process LRU in front of Redis.
+
+    Invalidations delete the Redis entry and are published on
+    ``INVALIDATION_CHANNEL`` so that every worker drops its local copy.
+    Without a Redis client only the local tier is used.
+
+    When the subscription drops, it is renewed after ``resubscribe_base *
+    2 ** (failures - 1)`` seconds, at most ``resubscribe_max``; the local tier
+    is cleared on resubscribe because invalidations sent meanwhile were missed.
+    """
+
+    def __init__(self, local_size: int, local_ttl: float, redis_ttl: int, resubscribe_base: float = 0.5,
+                 resubscribe_max: float = 30):
+        self.local = LRUCache(local_size, local_ttl)
+        self.redis_ttl = redis_ttl
+        self.resubscribe_base = resubscribe_base
+        self.resubscribe_max = resubscribe_max
+        self.resubscribes = 0
+        self.client: redis.Redis | None = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_evictions = 0
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, client: redis.Redis):
+        """
+        Attach the shared async Redis client and subscribe to invalidations.
+
+        :param client: Async Redis client backed by the application connection pool.
+        :type client: redis.Redis
+        """
+        self.client = client
+        self._listener = asyncio.create_task(self._listen(await self._subscribe()))
+
+    async def stop(self):
+        """
+        Stop listening for invalidations and detach the Redis client.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.client = None
+
+    async def _subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+        except BaseException:
+            await pubsub.aclose()
+            raise
+        return pubsub
+
+    async def _listen(self, pubsub):
+        failures = 0
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    self.resubscribes += 1
+                    self.local.clear()
+                    failures = 0
+                async for message in pubsub.listen():
+                    self.local.pop(message["data"].decode())
+                raise ConnectionError("Subscription ended")
+            except Exception:
+                failures += 1
+                delay = min(self.resubscribe_base * 2 ** (failures - 1), self.resubscribe_max)
+                logger.warning("Lost the user cache invalidation subscription, resubscribing in %.1f s", delay,
+                               exc_info=True)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+                    pubsub = None
+            await asyncio.sleep(delay)
+
+    async def get(self, email: str):
+        """
+        Retrieve a user from the local tier, falling back to Redis.
+
+        :param email: Email address of the user.
+        :type email: str
+        :return: Cached user, or None on a miss in both tiers.
+        :rtype: CachedUser or None
+        """
+        user = self.local.get(email)
+        if user is not None or self.client is None:
+            return user
+        data = await self.client.get(email)
+        user = deserialize_user(data) if data is not None else None
+        if user is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        self.local.set(email, user)
+        return user
+
+    async def set(self, user: User | CachedUser, expire: int | None = None):
+        """
+        Store a user in both tiers.
+
+        :param user: The user to cache.
+        :type user: User or CachedUser
+        :param expire: Time in seconds until the Redis entry expires, defaults to ``redis_ttl``.
+        :type expire: int, optional
+        """
+        data = serialize_user(user)
+        self.local.set(user.email, deserialize_user(data))
+        if self.client is not None:
+            await self.client.set(user.email, data, ex=expire or self.redis_ttl)
+
+    async def invalidate(self, email: str):
+        """
+        Evict a user from Redis and from the local tier of every worker.
+
+        :param email: Email address of the user.
+        :type email: str
+        """
+        self.local.pop(email)
+        if self.client is not None:
+            self.redis_evictions += await self.client.delete(email)
+            await self.client.publish(INVALIDATION_CHANNEL, email)
+
+    def stats(self):
+        """
+        :return: Hit, miss and eviction counters of both tiers.
+        :rtype: dict
+        """
+        return {
+            "local": self.local.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses, "evictions": self.redis_evictions,
+                      "resubscribes": self.resubscribes},
+        }
+
+
+user_cache = UserCache(config.USER_CACHE_LOCAL_SIZE, config.USER_CACHE_LOCAL_TTL, config.USER_CACHE_TTL)
@@ -4,7 +4,7 @@ import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from httpx import AsyncClient, ASGITransport
 from fastapi_project.main import app
-from fastapi_project.src.database.models import Base
+from fastapi_project.src.database.models import Base, User
 from fastapi_project.src.database.db import get_db
 
 DATABASE_URL = "sqlite+aiosqlite:///./test_async.db"
@@ -13,6 +13,31 @@ engine = create_async_engine(DATABASE_URL, connect_args={"check_same_thread": Fa
 TestingSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
 
+async def create_memory_engine():
+    """
+    Create an in-memory SQLite engine with the schema, for tests that need a database of their own.
+    """
+    memory_engine = create_async_engine("sqlite+aiosqlite://")
+    async with memory_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return memory_engine
+
+
+@pytest_asyncio.fixture
+async def session_maker():
+    """
+    Session factory of an in-memory database holding users 1 (one@example.com) and 2 (two@example.com).
+    """
+    memory_engine = await create_memory_engine()
+    session_maker = async_sessionmaker(bind=memory_engine, expire_on_commit=False)
+    async with session_maker() as db:
+        db.add_all([User(id=1, username="one", email="one@example.com", password="x"),
+                    User(id=2, username="two", email="two@example.com", password="x")])
+        await db.commit()
+    yield session_maker
+    await memory_engine.dispose()
+
+
 @pytest_asyncio.fixture(scope="module")
 async def session() -> AsyncGenerator[AsyncSession, None]:
     async with engine.begin() as conn:
@@ -1,18 +1,17 @@
 import pytest
-from unittest.mock import AsyncMock
 from sqlalchemy import select
-from fastapi_project.src.database.models import User
+from fastapi_project.src.database.models import EmailOutbox, User
 
 
 @pytest.mark.asyncio
-async def test_create_user(client, user, monkeypatch):
-    mock_send_email = AsyncMock()
-    monkeypatch.setattr("fastapi_project.src.routes.auth.send_email", mock_send_email)
+async def test_create_user(client, session, user):
     response = await client.post("/api/auth/signup", json=user)
     assert response.status_code == 201, response.text
     data = response.json()
     assert data["email"] == user["email"]
     assert data["username"] == user["username"]
+    queued = (await session.execute(select(EmailOutbox.kind).filter_by(email=user["email"]))).scalars().all()
+    assert queued == ["confirm"]
 
 
 @pytest.mark.asyncio
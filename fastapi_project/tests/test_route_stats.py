@@ -0,0 +1,35 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from fastapi_project.main import app as main_app
+from fastapi_project.src.database.models import User
+from fastapi_project.src.routes import stats
+from fastapi_project.src.services.auth import auth_service
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.include_router(stats.router, prefix="/api")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_stats_require_authentication(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for route in ("user_cache", "response_cache", "db_pool", "db_replicas", "avatars"):
+            response = await client.get(f"/api/stats/{route}")
+            assert response.status_code == 401, route
+
+
+@pytest.mark.asyncio
+async def test_stats_for_signed_in_user(app):
+    app.dependency_overrides[auth_service.get_current_user] = lambda: User(id=1, email="one@example.com")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/stats/avatars")
+    assert response.status_code == 200, response.text
+    assert response.json()["queued"] == 0
+
+
+def test_stats_are_not_served_by_default():
+    assert not any(route.path.startswith("/api/stats") for route in main_app.routes)
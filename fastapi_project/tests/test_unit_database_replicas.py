@@ -0,0 +1,63 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from fastapi_project.src.database.replicas import Replica, ReplicaSet
+
+SETTINGS = SimpleNamespace(DB_POOL_SIZE=2, DB_MAX_OVERFLOW=0, DB_POOL_PRE_PING=False, DB_POOL_RECYCLE=-1,
+                           DB_POOL_TIMEOUT=1, DB_STATEMENT_CACHE_SIZE=0)
+PRIMARY = object()
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    return [Replica(f"sqlite+aiosqlite:///{tmp_path / f'replica{i}.db'}", SETTINGS) for i in range(2)]
+
+
+@pytest.mark.asyncio
+async def test_round_robin_skips_unhealthy_replicas_and_falls_back_to_primary(replicas):
+    router = ReplicaSet(PRIMARY, replicas)
+    chosen = [await router.session_maker() for _ in range(4)]
+    assert chosen == [replicas[1].session_maker, replicas[0].session_maker] * 2
+    replicas[0].healthy = False
+    assert {await router.session_maker() for _ in range(3)} == {replicas[1].session_maker}
+    replicas[1].healthy = False
+    assert await router.session_maker() is PRIMARY
+    assert router.stats()["primary_reads"] == 1
+    assert await ReplicaSet(PRIMARY, []).session_maker("a@b.c") is PRIMARY
+
+
+@pytest.mark.asyncio
+async def test_least_connections_prefers_idle_replica(replicas):
+    router = ReplicaSet(PRIMARY, replicas, selection="least_connections")
+    connection = await replicas[0].engine.connect()
+    assert {await router.session_maker() for _ in range(4)} == {replicas[1].session_maker}
+    await connection.close()
+    for replica in replicas:
+        await replica.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_health_check_marks_unreachable_replica(replicas, tmp_path):
+    broken = Replica(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}", SETTINGS)
+    router = ReplicaSet(PRIMARY, [replicas[0], broken], health_interval=60)
+    await router.start()
+    assert replicas[0].healthy and not broken.healthy
+    assert broken.failed_checks == 1
+    assert {await router.session_maker() for _ in range(3)} == {replicas[0].session_maker}
+    await router.stop()
+
+
+@pytest.mark.asyncio
+async def test_recent_writes_read_from_primary(replicas):
+    client = AsyncMock()
+    client.exists.return_value = 1
+    router = ReplicaSet(PRIMARY, replicas, sticky_seconds=5)
+    await router.mark_write("writer@example.com")
+    assert await router.session_maker("writer@example.com") is PRIMARY
+    assert await router.session_maker("reader@example.com") is not PRIMARY
+    router.client = client
+    await router.mark_write("other@example.com")
+    client.set.assert_awaited_once_with("db:primary:other@example.com", 1, px=5000)
+    # Written through another worker: only Redis knows about it.
+    assert await router.session_maker("remote@example.com") is PRIMARY
+    client.exists.assert_awaited_with("db:primary:remote@example.com")
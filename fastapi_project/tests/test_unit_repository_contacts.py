@@ -1,17 +1,34 @@
+import subprocess
+import sys
 import unittest
 from unittest.mock import MagicMock, AsyncMock, Mock
-from datetime import date, timedelta
-from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_project.src.database.models import Contact, User
-from fastapi_project.src.schemas import ContactSchema
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from fastapi_project.src.database.models import Contact, User, change_now
+from fastapi_project.src.schemas import ContactSchema, ContactUpdateSchema
 from fastapi_project.src.repository.contacts import (
     create_contact,
     get_contact,
+    get_contact_version,
+    get_changes,
+    get_sync_watermark,
     update_contact,
+    patch_contact,
     delete_contact,
     get_contacts,
     get_birthdays_contacts,
+    search_contacts,
+    birthday_doy,
+    normalize_email,
+    normalize_phone,
+    birthday_sort_key,
+    contact_sort_key,
+    _birthday_window,
 )
+from fastapi_project.tests.conftest import create_memory_engine
 
 
 class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
@@ -60,14 +77,37 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
 
     async def test_get_birthdays_contacts(self):
         mocked_result = MagicMock()
-        mocked_result.scalars.return_value.all.return_value = self.test_contacts
+        mocked_result.scalars.return_value.all.return_value = self.test_contacts[:1]
         self.session.execute.return_value = mocked_result
         result = await get_birthdays_contacts(
             limit=10, offset=0, days=7, db=self.session, user=self.user
         )
+        self.session.execute.assert_awaited_once()
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].first_name, "John")
 
+    def test_birthday_doy(self):
+        self.assertIsNone(birthday_doy(None))
+        self.assertEqual(birthday_doy(date(1990, 1, 1)), 1)
+        self.assertEqual(birthday_doy(date(1992, 2, 29)), 60)
+        self.assertEqual(birthday_doy(date(1991, 3, 1)), 61)
+        self.assertEqual(birthday_doy(date(1991, 12, 31)), 366)
+
+    def test_normalize_email_and_phone(self):
+        self.assertEqual(normalize_email(" John.Doe@Example.COM "), "john.doe@example.com")
+        self.assertEqual(normalize_phone("+1 (555) 010-0100"), "+15550100100")
+        self.assertEqual(normalize_phone("1555 0100100"), "+15550100100")
+        self.assertEqual(normalize_phone("00 44 20 7946 0000"), "+442079460000")
+        self.assertIsNone(normalize_phone("n/a"))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_birthday_window(self):
+        self.assertEqual(_birthday_window(date(2025, 6, 10), 7), (162, 169))
+        self.assertEqual(_birthday_window(date(2025, 12, 28), 7), (363, 4))
+        self.assertEqual(_birthday_window(date(2025, 2, 21), 7), (52, 60))
+        self.assertEqual(_birthday_window(date(2028, 2, 21), 7), (52, 59))
+        self.assertEqual(_birthday_window(date(2025, 1, 1), 365), (1, None))
+
     async def test_get_contact_found(self):
         mocked_result = MagicMock()
         mocked_result.scalar_one_or_none.return_value = self.test_contacts[0]
@@ -85,14 +125,15 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(result)
 
     async def test_create_contact(self):
-        body = self.test_body
-        result = await create_contact(body, self.session, self.user)
-        self.assertIsInstance(result, Contact)
-        self.assertEqual(result.first_name, body.first_name)
-        self.assertEqual(result.last_name, body.last_name)
-        self.assertEqual(result.email, body.email)
-        self.assertEqual(result.phone_number, body.phone_number)
-        self.assertEqual(result.birthday, body.birthday)
+        mocked_result = MagicMock()
+        mocked_result.scalar_one.return_value = self.test_contacts[0]
+        self.session.execute.return_value = mocked_result
+        result = await create_contact(self.test_body, self.session, self.user)
+        self.session.execute.assert_awaited_once()
+        self.session.expunge.assert_called_once_with(self.test_contacts[0])
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+        self.assertEqual(result, self.test_contacts[0])
 
     async def test_update_contact_found(self):
         mocked_result = MagicMock()
@@ -103,12 +144,8 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
         )
         self.session.execute.assert_awaited_once()
         self.session.commit.assert_awaited_once()
-        self.session.refresh.assert_awaited_once_with(self.test_contacts[0])
-        self.assertEqual(result.first_name, self.test_body.first_name)
-        self.assertEqual(result.last_name, self.test_body.last_name)
-        self.assertEqual(result.email, self.test_body.email)
-        self.assertEqual(result.phone_number, self.test_body.phone_number)
-        self.assertEqual(result.birthday, self.test_body.birthday)
+        self.session.refresh.assert_not_awaited()
+        self.assertEqual(result, self.test_contacts[0])
 
     async def test_update_contact_not_found(self):
         mocked_result = MagicMock()
@@ -118,7 +155,7 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
             self.test_contacts[0].id, self.test_body, self.session, self.user
         )
         self.session.execute.assert_awaited_once()
-        self.session.commit.assert_not_awaited()
+        self.session.expunge.assert_not_called()
         self.session.refresh.assert_not_awaited()
         self.assertIsNone(result)
 
@@ -127,7 +164,8 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
         mocked_result.scalar_one_or_none.return_value = self.test_contacts[0]
         self.session.execute.return_value = mocked_result
         result = await delete_contact(self.test_contacts[0].id, self.session, self.user)
-        self.session.delete.assert_awaited_once_with(self.test_contacts[0])
+        self.session.execute.assert_awaited_once()
+        self.session.delete.assert_not_awaited()
         self.session.commit.assert_awaited_once()
         self.assertEqual(result, self.test_contacts[0])
 
@@ -136,10 +174,234 @@ class TestAsyncTodo(unittest.IsolatedAsyncioTestCase):
         mocked_result.scalar_one_or_none.return_value = None
         self.session.execute.return_value = mocked_result
         result = await delete_contact(self.test_contacts[0].id, self.session, self.user)
+        self.session.execute.assert_awaited_once()
         self.session.delete.assert_not_awaited()
-        self.session.commit.assert_not_awaited()
         self.assertIsNone(result)
 
 
+class TestContactsSQL(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = await create_memory_engine()
+        self.session = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = User(username="test_user", email="test@example.com", password="qwerty")
+        self.other_user = User(username="other_user", email="other@example.com", password="qwerty")
+        today = date.today()
+        offsets = {"In5": 5, "Today": 0, "In2": 2, "Past": -3, "Far": 40}
+        for i, (name, days) in enumerate(offsets.items()):
+            birthday = (today + timedelta(days=days)).replace(year=2000)
+            self.session.add(Contact(
+                first_name=name,
+                last_name="Doe",
+                email=f"{name.lower()}@example.com",
+                phone_number=f"12345{i}",
+                birthday=birthday,
+                birthday_doy=birthday_doy(birthday),
+                user=self.user,
+            ))
+        self.session.add(Contact(
+            first_name="Other",
+            last_name="Doe",
+            email="other.doe@example.com",
+            phone_number="999",
+            birthday=today.replace(year=2000),
+            birthday_doy=birthday_doy(today),
+            user=self.other_user,
+        ))
+        self.session.add(Contact(
+            first_name="NoBirthday", last_name="Doe", email="nb@example.com", phone_number="998", user=self.user
+        ))
+        await self.session.commit()
+
+    async def asyncTearDown(self) -> None:
+        await self.session.close()
+        await self.engine.dispose()
+
+    def count_statements(self):
+        statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        return statements
+
+    async def test_writes_take_one_round_trip(self):
+        # Expiring session, like SessionLocal: returned contacts must not be reloaded after commit.
+        session = async_sessionmaker(bind=self.engine)()
+        statements = self.count_statements()
+        body = ContactSchema(first_name="New", last_name="Doe", email="new@example.com", phone_number="555",
+                             birthday="1990-01-01")
+        contact = await create_contact(body, session, self.user)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual((contact.first_name, contact.birthday_doy, contact.user_id), ("New", 1, self.user.id))
+        self.assertIsNotNone(contact.created_at)
+
+        body.first_name, body.birthday = "Renamed", date(1990, 2, 1)
+        contact = await update_contact(contact.id, body, session, self.user)
+        self.assertEqual(len(statements), 2)
+        self.assertEqual((contact.first_name, contact.birthday_doy), ("Renamed", 32))
+        self.assertIsNone(await update_contact(contact.id, body, session, self.other_user))
+
+        deleted = await delete_contact(contact.id, session, self.user)
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(deleted.id, contact.id)
+        self.assertIsNone(await get_contact(contact.id, session, self.user))
+        await session.close()
+
+    async def test_patch_contact_updates_only_given_fields(self):
+        contact = await get_contacts(limit=10, offset=0, use_get_filters={"first_name": "In2"}, db=self.session,
+                                     user=self.user)
+        contact = contact[0]
+        self.assertEqual(contact.version, 1)
+        statements = self.count_statements()
+        patched = await patch_contact(contact.id, ContactUpdateSchema(birthday="1990-01-01", add_info=None),
+                                      self.session, self.user, version=1)
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("first_name", statements[0].split("RETURNING")[0])
+        self.assertEqual((patched.first_name, patched.email, patched.birthday_doy, patched.add_info, patched.version),
+                         ("In2", "in2@example.com", 1, None, 2))
+
+        self.assertIsNone(await patch_contact(contact.id, ContactUpdateSchema(first_name="Stale"),
+                                              self.session, self.user, version=1))
+        self.assertIsNone(await patch_contact(contact.id, ContactUpdateSchema(first_name="Other"),
+                                              self.session, self.other_user))
+        patched = await patch_contact(contact.id, ContactUpdateSchema(first_name="Fresh"), self.session, self.user)
+        self.assertEqual((patched.first_name, patched.version), ("Fresh", 3))
+        self.assertEqual(await get_contact_version(contact.id, self.session, self.user), 3)
+        self.assertIsNone(await get_contact_version(contact.id, self.session, self.other_user))
+
+    async def test_lookup_by_normalized_email_and_phone(self):
+        body = ContactSchema(first_name="New", last_name="Doe", email="New.Doe@Example.com",
+                             phone_number="+1 (555) 010-0100", birthday="1990-01-01")
+        contact = await create_contact(body, self.session, self.user)
+        self.assertEqual((contact.email_normalized, contact.phone_normalized), ("new.doe@example.com", "+15550100100"))
+        for filters in ({"email": "NEW.DOE@example.com"}, {"phone_number": "1-555-010-0100"}):
+            result = await get_contacts(10, 0, filters, self.session, self.user)
+            self.assertEqual([c.id for c in result], [contact.id])
+            self.assertEqual(await get_contacts(10, 0, filters, self.session, self.other_user), [])
+
+        patched = await patch_contact(contact.id, ContactUpdateSchema(phone_number="15550100199"), self.session, self.user)
+        self.assertEqual((patched.email_normalized, patched.phone_normalized), ("new.doe@example.com", "+15550100199"))
+
+        duplicate = ContactSchema(first_name="Dup", last_name="Doe", email="new.doe@EXAMPLE.com",
+                                  phone_number="000", birthday="1990-01-01")
+        with self.assertRaises(IntegrityError):
+            await create_contact(duplicate, self.session, self.user)
+
+    async def test_search_contacts_by_prefix(self):
+        result = await search_contacts("in", 10, 0, {}, self.session, self.user)
+        self.assertEqual({c.first_name for c in result}, {"In2", "In5"})
+        result = await search_contacts("DOE fa", 10, 0, {}, self.session, self.user)
+        self.assertEqual([c.first_name for c in result], ["Far"])
+        self.assertEqual(await search_contacts("other", 10, 0, {}, self.session, self.user), [])
+        self.assertEqual(await search_contacts('"*', 10, 0, {}, self.session, self.user), [])
+        page = await search_contacts("doe", 2, 1, {}, self.session, self.user)
+        self.assertEqual(len(page), 2)
+        result = await search_contacts("doe", 10, 0, {"first_name": "Today"}, self.session, self.user)
+        self.assertEqual([c.first_name for c in result], ["Today"])
+
+    def test_search_index_compiles_for_postgresql_without_engine(self):
+        # Alembic and other tools import the models before any asyncpg engine exists.
+        script = ("from fastapi_project.src.database.models import contact_search_vector; "
+                  "from sqlalchemy.dialects.postgresql import dialect; "
+                  "print(contact_search_vector.compile(dialect=dialect()))")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertTrue(result.stdout.startswith("to_tsvector('simple', "))
+
+    async def test_search_index_follows_writes(self):
+        far = (await search_contacts("far", 10, 0, {}, self.session, self.user))[0]
+        await patch_contact(far.id, ContactUpdateSchema(first_name="Zed", add_info="met in Lisbon"),
+                            self.session, self.user)
+        self.assertEqual([c.id for c in await search_contacts("lisb", 10, 0, {}, self.session, self.user)], [far.id])
+        self.assertEqual([c.id for c in await search_contacts("zed", 10, 0, {}, self.session, self.user)], [far.id])
+        await delete_contact(far.id, self.session, self.user)
+        self.assertEqual(await search_contacts("zed", 10, 0, {}, self.session, self.user), [])
+
+    async def test_get_changes_returns_delta_and_tombstones(self):
+        # Move the fixtures out of the current second, the resolution of SQLite timestamps.
+        await self.session.execute(update(Contact).values(updated_at=datetime(2020, 1, 1)))
+        await self.session.commit()
+        self.session.expire_all()
+        await self.session.refresh(self.user)
+        await self.session.refresh(self.other_user)
+        until = await get_sync_watermark(0, self.session)
+        first, deleted = await get_changes(None, (until, 0), until, 4, self.session, self.user)
+        self.assertEqual((len(first), deleted), (4, []))
+        rest, _ = await get_changes((first[-1].updated_at, first[-1].id), (until, 0), until, 4, self.session, self.user)
+        self.assertEqual(len(rest), 2)
+        self.assertEqual({c.id for c in first + rest}, {c.id for c in await get_contacts(10, 0, {}, self.session, self.user)})
+
+        changed, removed = first[0], first[1]
+        await patch_contact(changed.id, ContactUpdateSchema(add_info="changed"), self.session, self.user)
+        await delete_contact(removed.id, self.session, self.user)
+        other = (await get_contacts(10, 0, {}, self.session, self.other_user))[0]
+        await delete_contact(other.id, self.session, self.other_user)
+        position = (rest[-1].updated_at, rest[-1].id)
+        self.assertEqual(await get_changes(position, (until, 0), datetime(2019, 1, 1), 10, self.session, self.user),
+                         ([], []))
+        next_until = await get_sync_watermark(0, self.session)
+        updated, deleted = await get_changes(position, (until, 0), next_until, 10, self.session, self.user)
+        self.assertEqual([c.id for c in updated], [changed.id])
+        self.assertEqual([t.contact_id for t in deleted], [removed.id])
+
+    async def test_sync_watermark_is_naive(self):
+        # asyncpg cannot bind an aware datetime to the timestamp without time zone change columns.
+        self.assertIsNone((await get_sync_watermark(0, self.session)).tzinfo)
+        stmt = select(Contact.id).filter(Contact.updated_at <= select(change_now()).scalar_subquery())
+        self.assertIn("updated_at <= (SELECT LOCALTIMESTAMP", str(stmt.compile(dialect=asyncpg.dialect())))
+        self.assertFalse(change_now().type.timezone)
+
+    def test_patch_schema_rejects_null_for_required_fields(self):
+        with self.assertRaises(ValueError):
+            ContactUpdateSchema(first_name=None)
+        self.assertEqual(ContactUpdateSchema(add_info=None).model_dump(exclude_unset=True), {"add_info": None})
+
+    async def test_get_contacts_ordered_by_name(self):
+        result = await get_contacts(limit=10, offset=0, use_get_filters={"last_name": "Doe"}, db=self.session,
+                                    user=self.user)
+        self.assertEqual([c.first_name for c in result], ["Far", "In2", "In5", "NoBirthday", "Past", "Today"])
+
+    async def test_filters_and_orders_in_database(self):
+        result = await get_birthdays_contacts(limit=10, offset=0, days=7, db=self.session, user=self.user)
+        self.assertEqual([c.first_name for c in result], ["Today", "In2", "In5"])
+
+    async def test_paginates_in_database(self):
+        result = await get_birthdays_contacts(limit=1, offset=1, days=7, db=self.session, user=self.user)
+        self.assertEqual([c.first_name for c in result], ["In2"])
+
+    async def test_get_contacts_keyset_pages(self):
+        first_page = await get_contacts(limit=4, offset=0, use_get_filters={}, db=self.session, user=self.user)
+        second_page = await get_contacts(limit=4, offset=0, use_get_filters={}, db=self.session, user=self.user,
+                                         after=contact_sort_key(first_page[-1]))
+        self.assertEqual([c.first_name for c in first_page], ["Far", "In2", "In5", "NoBirthday"])
+        self.assertEqual([c.first_name for c in second_page], ["Past", "Today"])
+
+    async def test_birthdays_keyset_pages(self):
+        first_page = await get_birthdays_contacts(limit=2, offset=0, days=365, db=self.session, user=self.user)
+        second_page = await get_birthdays_contacts(limit=2, offset=0, days=365, db=self.session, user=self.user,
+                                                   after=birthday_sort_key(first_page[-1]))
+        third_page = await get_birthdays_contacts(limit=2, offset=0, days=365, db=self.session, user=self.user,
+                                                  after=birthday_sort_key(second_page[-1]))
+        self.assertEqual([c.first_name for c in first_page], ["Today", "In2"])
+        self.assertEqual([c.first_name for c in second_page], ["In5", "Far"])
+        self.assertEqual([c.first_name for c in third_page], ["Past"])
+
+    async def test_whole_year_window(self):
+        result = await get_birthdays_contacts(limit=10, offset=0, days=365, db=self.session, user=self.user)
+        self.assertEqual([c.first_name for c in result], ["Today", "In2", "In5", "Far", "Past"])
+
+    async def test_wrapped_window_reads_ranges_in_index_order(self):
+        statements = self.count_statements()
+        result = await get_birthdays_contacts(limit=2, offset=3, days=365, db=self.session, user=self.user)
+        self.assertEqual([c.first_name for c in result], ["Far", "Past"])
+        # Two range scans ordered like the (user_id, birthday_doy, id) index, no computed sort key.
+        statement, = statements
+        self.assertNotIn("CASE", statement)
+        self.assertEqual(statement.count("ORDER BY contacts.birthday_doy, contacts.id"), 2)
+        after = birthday_sort_key(result[0])
+        result = await get_birthdays_contacts(limit=5, offset=0, days=365, db=self.session, user=self.user,
+                                              after=after)
+        self.assertEqual([c.first_name for c in result], ["Past"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,10 @@
 import pytest
 from datetime import datetime, timedelta, UTC
-from jose import jwt
+from jose import jwt, JWTError
 from fastapi import HTTPException, status
-from fastapi_project.src.services.auth import Auth
+from unittest.mock import AsyncMock, patch
+from fastapi_project.src.services.auth import Auth, PasswordHasher, _hash_password, _verify_password
+from fastapi_project.src.services.user_cache import CachedUser
 
 @pytest.fixture
 def auth():
@@ -19,6 +21,28 @@ def test_get_password_hash(auth):
     assert isinstance(hashed, str)
     assert auth.verify_password(password, hashed)
 
+@pytest.mark.asyncio
+async def test_password_hash_async(auth):
+    hashed = await auth.get_password_hash_async("password")
+    assert await auth.verify_password_async("password", hashed)
+    assert not await auth.verify_password_async("wrong", hashed)
+
+@pytest.mark.asyncio
+async def test_password_hasher_sheds_load():
+    hasher = PasswordHasher("thread", workers=1, queue_size=0)
+    hasher.pending = 1
+    with pytest.raises(HTTPException) as excinfo:
+        await hasher.run(len, "password")
+    assert excinfo.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+@pytest.mark.asyncio
+async def test_process_password_hasher_uses_forkserver():
+    hasher = PasswordHasher("process", workers=1, queue_size=0)
+    assert hasher.executor._mp_context.get_start_method() == "forkserver"
+    hashed = await hasher.run(_hash_password, "password")
+    assert await hasher.run(_verify_password, "password", hashed)
+    hasher.shutdown()
+
 @pytest.mark.asyncio
 async def test_create_access_token(auth):
     data = {"sub": "test@example.com"}
@@ -89,3 +113,30 @@ def test_create_email_token(auth):
     token = auth.create_email_token(data)
     decoded = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
     assert decoded["sub"] == "test@example.com"
+
+@pytest.mark.asyncio
+async def test_decode_token_caches_verified_claims(auth):
+    token = await auth.create_access_token({"sub": "cached@example.com"})
+    with patch("fastapi_project.src.services.auth.jwt.decode", wraps=jwt.decode) as mock_decode:
+        assert auth.decode_token(token)["sub"] == "cached@example.com"
+        assert auth.decode_token(token)["sub"] == "cached@example.com"
+    mock_decode.assert_called_once()
+
+def test_decode_token_does_not_cache_expired_tokens(auth):
+    token = jwt.encode(
+        {"sub": "test@example.com", "exp": datetime.now(UTC) - timedelta(seconds=1)},
+        auth.SECRET_KEY, algorithm=auth.ALGORITHM
+    )
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            auth.decode_token(token)
+
+@pytest.mark.asyncio
+async def test_get_current_user_from_cache(auth, monkeypatch):
+    cached_user = CachedUser(1, "test", "test@example.com", None, True, 1)
+    mock_get = AsyncMock(return_value=cached_user)
+    monkeypatch.setattr(auth.user_cache, "get", mock_get)
+    token = await auth.create_access_token({"sub": "test@example.com"})
+    user = await auth.get_current_user(token, AsyncMock())
+    mock_get.assert_awaited_once_with("test@example.com")
+    assert user is cached_user
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from fastapi_project.src.conf.config import Settings
+from fastapi_project.src.database.models import User
+from fastapi_project.src.services.avatars import AvatarUploader
+from fastapi_project.src.services.storage import CloudinaryStorage, LocalStorage, StorageBackend
+
+
+class BrokenStorage(LocalStorage):
+    def save(self, name, path):
+        raise ConnectionError("storage is down")
+
+
+def upload(data: bytes):
+    return UploadFile(io.BytesIO(data), size=len(data), filename="avatar.png")
+
+
+async def avatar(session_maker):
+    async with session_maker() as db:
+        return (await db.get(User, 1)).avatar
+
+
+@pytest.mark.asyncio
+async def test_enqueue_stages_then_stores_avatar(session_maker, tmp_path):
+    storage = LocalStorage(tmp_path / "avatars", "/media/avatars")
+    uploader = AvatarUploader(storage, session_maker, tmp_path / "staging", max_bytes=1024)
+    user = User(id=1, email="one@example.com")
+    job = await uploader.enqueue(upload(b"image"), user)
+    # Staged and flushed before the request returns.
+    assert (tmp_path / "staging" / f"{job}.upload").read_bytes() == b"image"
+    assert (tmp_path / "staging" / f"{job}.json").exists()
+
+    await asyncio.gather(*uploader.tasks)
+    name = hashlib.sha256(b"image").hexdigest() + ".png"
+    assert (tmp_path / "avatars" / name).read_bytes() == b"image"
+    assert await avatar(session_maker) == f"/media/avatars/{name}"
+    assert list((tmp_path / "staging").iterdir()) == []
+
+    # The same image again is not stored again.
+    await uploader.enqueue(upload(b"image"), user)
+    await asyncio.gather(*uploader.tasks)
+    assert uploader.stats() == {"queued": 2, "in_flight": 0, "uploaded": 2, "failed": 0, "rejected": 0,
+                                "deduplicated": 1}
+    await uploader.stop()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_too_large_upload(session_maker, tmp_path):
+    uploader = AvatarUploader(LocalStorage(tmp_path, "/"), session_maker, tmp_path / "staging", max_bytes=4)
+    with pytest.raises(HTTPException) as err:
+        await uploader.enqueue(upload(b"image"), User(id=1, email="one@example.com"))
+    assert err.value.status_code == 413
+    # Without a declared size the limit is enforced while copying.
+    with pytest.raises(HTTPException):
+        await uploader.enqueue(UploadFile(io.BytesIO(b"image")), User(id=1, email="one@example.com"))
+    assert list((tmp_path / "staging").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_stays_staged_and_is_resumed_on_start(session_maker, tmp_path):
+    broken = AvatarUploader(BrokenStorage(tmp_path / "avatars", "/media/avatars"), session_maker, tmp_path / "staging", max_bytes=1024)
+    await broken.enqueue(upload(b"image"), User(id=1, email="one@example.com"))
+    await asyncio.gather(*broken.tasks)
+    assert broken.failed == 1
+    assert await avatar(session_maker) is None
+    await broken.stop()
+
+    uploader = AvatarUploader(LocalStorage(tmp_path / "avatars", "/media/avatars"), session_maker,
+                              tmp_path / "staging", max_bytes=1024)
+    assert uploader.start() == 1
+    await asyncio.gather(*uploader.tasks)
+    assert await avatar(session_maker) == f"/media/avatars/{hashlib.sha256(b'image').hexdigest()}.png"
+    assert list((tmp_path / "staging").iterdir()) == []
+    await uploader.stop()
+
+
+@pytest.mark.asyncio
+async def test_staged_job_is_resumed_by_one_worker_only(session_maker, tmp_path):
+    broken = AvatarUploader(BrokenStorage(tmp_path / "avatars", "/media/avatars"), session_maker, tmp_path / "staging", max_bytes=1024)
+    await broken.enqueue(upload(b"image"), User(id=1, email="one@example.com"))
+    await asyncio.gather(*broken.tasks)
+    await broken.stop()
+
+    workers = [AvatarUploader(LocalStorage(tmp_path / "avatars", "/media/avatars"), session_maker,
+                              tmp_path / "staging", max_bytes=1024) for _ in range(3)]
+    assert [worker.start() for worker in workers] == [1, 0, 0]
+    await asyncio.gather(*workers[0].tasks)
+    assert workers[0].uploaded == 1
+    # Once the job is done, a later start finds nothing left to resume.
+    assert workers[1].start() == 0
+    assert list((tmp_path / "staging").iterdir()) == []
+    for worker in workers:
+        await worker.stop()
+
+
+def test_local_storage_requires_local_processing():
+    with pytest.raises(ValidationError):
+        Settings(AVATAR_STORAGE="local", AVATAR_PROCESSING="cloudinary")
+    assert Settings(AVATAR_STORAGE="local", AVATAR_PROCESSING="local").AVATAR_STORAGE == "local"
+
+
+def test_storage_backend_must_implement_every_method():
+    class SaveOnly(StorageBackend):
+        def save(self, name, path):
+            return name
+
+    with pytest.raises(TypeError):
+        SaveOnly()
+
+
+def test_cloudinary_storage_does_not_probe_admin_api(tmp_path):
+    storage = CloudinaryStorage()
+    with patch("cloudinary.uploader.upload") as upload_file, patch("cloudinary.api.resource") as resource:
+        assert not storage.exists("abc.png")
+        storage.save("abc.png", tmp_path / "abc.png")
+        assert storage.exists("abc.png")
+    upload_file.assert_called_once_with(str(tmp_path / "abc.png"), public_id="Web16/abc", overwrite=True)
+    resource.assert_not_called()
@@ -0,0 +1,115 @@
+import csv
+import gzip
+import json
+import unittest
+import zlib
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from fastapi_project.src.database.models import Contact, User
+from fastapi_project.src.repository.contacts import stream_contacts
+from fastapi_project.src.services.contacts_io import import_contacts, export_contacts, CSV, EXPORT_FIELDS, NDJSON
+from fastapi_project.tests.conftest import create_memory_engine
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestImportContacts(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = await create_memory_engine()
+        self.session = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = User(username="test_user", email="test@example.com", password="qwerty")
+        self.session.add(self.user)
+        self.session.add(Contact(first_name="Old", last_name="Doe", email="old@example.com", phone_number="100",
+                                 user=self.user))
+        await self.session.commit()
+
+    async def asyncTearDown(self) -> None:
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def contacts(self):
+        result = await self.session.execute(select(Contact).order_by(Contact.id))
+        return result.scalars().all()
+
+    async def test_import_csv(self):
+        body = (
+            b"first_name,last_name,email,phone_number,birthday,add_info\n"
+            b'John,Doe,john@example.com,101,1990-01-05,"multi\nline"\n'
+            b"Jane,Doe,jane@exa", b"mple.com,102,1991-02-03,\n"
+            b"Bad,Doe,not-an-email,103,1991-02-03,\n"
+            b"Old,Doe,old@example.com,104,1991-02-03,\n"
+            b"Short,Doe\n"
+        )
+        report = await import_contacts(stream(*body), CSV, 2,
+                                       self.session, self.user)
+        self.assertEqual((report.imported, report.failed), (2, 3))
+        self.assertEqual([error.row for error in report.errors], [3, 4, 5])
+        contacts = await self.contacts()
+        self.assertEqual([c.first_name for c in contacts], ["Old", "John", "Jane"])
+        self.assertEqual(contacts[1].add_info, "multi\nline")
+        self.assertEqual(contacts[1].birthday_doy, 5)
+        self.assertEqual(contacts[1].user_id, self.user.id)
+
+    async def test_import_ndjson(self):
+        report = await import_contacts(stream(
+            b'{"first_name":"John","last_name":"Doe","email":"john@example.com","phone_number":"101",'
+            b'"birthday":"1990-01-05"}\n\n',
+            b'{"first_name":"Twin","last_name":"Doe","email":"john@example.com","phone_number":"102",'
+            b'"birthday":"1990-01-05"}\n',
+            b'not json\n[1, 2]\n',
+        ), NDJSON, 10, self.session, self.user)
+        self.assertEqual((report.imported, report.failed), (1, 3))
+        self.assertEqual([error.row for error in report.errors], [2, 3, 4])
+        self.assertEqual(len(await self.contacts()), 2)
+
+
+class TestExportContacts(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = await create_memory_engine()
+        self.session = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = User(username="test_user", email="test@example.com", password="qwerty")
+        other_user = User(username="other_user", email="other@example.com", password="qwerty")
+        for i in range(3):
+            self.session.add(Contact(first_name=f"John{i}", last_name="Doe", email=f"john{i}@example.com",
+                                     phone_number=f"10{i}", birthday=date(1990, 1, i + 1), user=self.user))
+        self.session.add(Contact(first_name="Other", last_name="Doe", email="other.doe@example.com",
+                                 phone_number="200", user=other_user))
+        await self.session.commit()
+
+    async def asyncTearDown(self) -> None:
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def export(self, export_format, compress=False):
+        contacts = await stream_contacts(self.session, self.user, batch_size=2)
+        return b"".join([chunk async for chunk in export_contacts(contacts, export_format, compress)])
+
+    async def test_export_ndjson(self):
+        rows = [json.loads(line) for line in (await self.export("ndjson")).splitlines()]
+        self.assertEqual([row["first_name"] for row in rows], ["John0", "John1", "John2"])
+        self.assertEqual(rows[1]["birthday"], "1990-01-02")
+
+    async def test_export_csv_gzip(self):
+        data = gzip.decompress(await self.export("csv", compress=True)).decode()
+        rows = list(csv.DictReader(data.splitlines()))
+        self.assertEqual([row["email"] for row in rows], ["john0@example.com", "john1@example.com", "john2@example.com"])
+        self.assertEqual(rows[0]["add_info"], "")
+
+    async def test_export_sends_first_contact_at_once(self):
+        contacts = await stream_contacts(self.session, self.user, batch_size=2)
+        chunks = [chunk async for chunk in export_contacts(contacts, "ndjson")]
+        self.assertEqual(json.loads(chunks[0])["first_name"], "John0")
+        self.assertEqual(len(chunks), 2)
+
+        contacts = await stream_contacts(self.session, self.user, batch_size=2)
+        chunks = export_contacts(contacts, "csv", compress=True)
+        decompressor = zlib.decompressobj(wbits=31)
+        self.assertEqual(decompressor.decompress(await anext(chunks)).decode(), ",".join(EXPORT_FIELDS) + "\n")
+        self.assertIn("john0@example.com", decompressor.decompress(await anext(chunks)).decode())
+        await chunks.aclose()
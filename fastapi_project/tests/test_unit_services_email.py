@@ -1,73 +1,83 @@
 import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi_mail.errors import ConnectionErrors
-from fastapi_project.src.services.email import send_email, send_rp_email
+from fastapi_project.src.services.email import build_message, deliver
 
 
 @pytest.mark.asyncio
-@patch("fastapi_project.src.services.email.FastMail")
+@patch("fastapi_project.src.services.email.mail_transport.send", new_callable=AsyncMock, return_value=[None])
 @patch("fastapi_project.src.services.email.auth_service.create_email_token", return_value="fake_token")
-async def test_send_email_success(mock_create_token, mock_fastmail):
-    mock_fm_instance = AsyncMock()
-    mock_fastmail.return_value = mock_fm_instance
-
-    await send_email(
+async def test_deliver_confirm_email(mock_create_token, mock_send):
+    await deliver(
+        "confirm",
         email="test@example.com",
         username="testuser",
-        host="http://localhost:8000"
+        host="http://localhost:8000/"
     )
 
     mock_create_token.assert_called_once_with({"sub": "test@example.com"})
-    mock_fm_instance.send_message.assert_awaited_once()
-    args, kwargs = mock_fm_instance.send_message.call_args
-    assert kwargs["template_name"] == "email_template.html"
+    mock_send.assert_awaited_once()
+    message, = mock_send.call_args.args[0]
+    assert message["To"] == "test@example.com"
+    assert message["Subject"] == "Confirm your email "
+    assert message.get_content_type() == "text/html"
+    assert "http://localhost:8000/api/auth/confirmed_email/fake_token" in message.get_content()
 
 
 @pytest.mark.asyncio
-@patch("fastapi_project.src.services.email.FastMail")
+@patch("fastapi_project.src.services.email.mail_transport.send", new_callable=AsyncMock, return_value=[None])
 @patch("fastapi_project.src.services.email.auth_service.create_email_token", return_value="fake_token")
-async def test_send_rp_email_success(mock_create_token, mock_fastmail):
-    mock_fm_instance = AsyncMock()
-    mock_fastmail.return_value = mock_fm_instance
-    await send_rp_email(
+async def test_deliver_reset_email(mock_create_token, mock_send):
+    await deliver(
+        "reset",
         email="test@example.com",
         username="testuser",
         host="http://localhost:8000"
     )
 
     mock_create_token.assert_called_once_with({"sub": "test@example.com"})
-    mock_fm_instance.send_message.assert_awaited_once()
-    args, kwargs = mock_fm_instance.send_message.call_args
-    assert kwargs["template_name"] == "email_rp_template.html"
+    mock_send.assert_awaited_once()
+    message, = mock_send.call_args.args[0]
+    assert message["Subject"] == "Reset your email "
 
 
 @pytest.mark.asyncio
-@patch("fastapi_project.src.services.email.FastMail.send_message", new_callable=AsyncMock)
+@patch("fastapi_project.src.services.email.mail_transport.send", new_callable=AsyncMock)
 @patch("fastapi_project.src.services.email.auth_service.create_email_token", return_value="fake_token")
-async def test_send_email_connection_error(mock_create_token, mock_send_message):
-    mock_send_message.side_effect = ConnectionErrors("Connection failed")
+async def test_deliver_connection_error(mock_create_token, mock_send):
+    mock_send.side_effect = ConnectionErrors("Connection failed")
 
-    await send_email(
-        email="test@example.com",
-        username="testuser",
-        host="http://localhost:8000"
-    )
+    with pytest.raises(ConnectionErrors):
+        await deliver(
+            "confirm",
+            email="test@example.com",
+            username="testuser",
+            host="http://localhost:8000"
+        )
 
     mock_create_token.assert_called_once()
-    mock_send_message.assert_awaited_once()
+    mock_send.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-@patch("fastapi_project.src.services.email.FastMail.send_message", new_callable=AsyncMock)
+@patch("fastapi_project.src.services.email.mail_transport.send", new_callable=AsyncMock)
 @patch("fastapi_project.src.services.email.auth_service.create_email_token", return_value="fake_token")
-async def test_send_rp_email_connection_error(mock_create_token, mock_send_message):
-    mock_send_message.side_effect = ConnectionErrors("Connection failed - Test - OK")
+async def test_deliver_raises_send_error(mock_create_token, mock_send):
+    mock_send.return_value = [ConnectionErrors("Connection failed - Test - OK")]
 
-    await send_rp_email(
-        email="test@example.com",
-        username="testuser",
-        host="http://localhost:8000"
-    )
+    with pytest.raises(ConnectionErrors):
+        await deliver(
+            "reset",
+            email="test@example.com",
+            username="testuser",
+            host="http://localhost:8000"
+        )
 
     mock_create_token.assert_called_once()
-    mock_send_message.assert_awaited_once()
+    mock_send.assert_awaited_once()
+
+
+@patch("fastapi_project.src.services.email.auth_service.create_email_token", return_value="fake_token")
+def test_build_message_unknown_kind(mock_create_token):
+    with pytest.raises(KeyError):
+        build_message("newsletter", "test@example.com", "testuser", "http://localhost:8000")
@@ -0,0 +1,61 @@
+import asyncio
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi_project.src.database.models import User
+from fastapi_project.src.services.avatars import AvatarUploader
+from fastapi_project.src.services.images import ImagePipeline, InvalidImage, file_digest, probe
+from fastapi_project.src.services.storage import LocalStorage
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def jpeg(width=400, height=300, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def test_probe_rejects_non_images_and_oversized_images(tmp_path):
+    (tmp_path / "text.png").write_bytes(b"not an image")
+    with pytest.raises(InvalidImage):
+        probe(tmp_path / "text.png", 10_000_000)
+    (tmp_path / "big.jpg").write_bytes(jpeg(400, 300))
+    assert probe(tmp_path / "big.jpg", 120_000) == ("JPEG", 400, 300)
+    with pytest.raises(InvalidImage):
+        probe(tmp_path / "big.jpg", 119_999)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_renders_square_variants(tmp_path):
+    (tmp_path / "job.upload").write_bytes(jpeg())
+    pipeline = ImagePipeline([250, 64], "webp", workers=1)
+    try:
+        files = await pipeline.render(tmp_path / "job.upload", tmp_path)
+    finally:
+        pipeline.shutdown()
+    assert [path.name for path in files] == ["job.250.webp", "job.64.webp"]
+    with Image.open(files[1]) as image:
+        assert (image.format, image.size) == ("WEBP", (64, 64))
+
+
+@pytest.mark.asyncio
+async def test_uploader_stores_content_addressed_variants(session_maker, tmp_path):
+    pipeline = ImagePipeline([250, 64], "jpeg", workers=1)
+    uploader = AvatarUploader(LocalStorage(tmp_path / "avatars", "/media/avatars"), session_maker,
+                              tmp_path / "staging", max_bytes=1_000_000, pipeline=pipeline)
+    user = User(id=1, email="one@example.com")
+    with pytest.raises(HTTPException) as err:
+        await uploader.enqueue(UploadFile(io.BytesIO(b"<svg/>"), filename="a.svg"), user)
+    assert err.value.status_code == 415
+
+    data = jpeg()
+    await uploader.enqueue(UploadFile(io.BytesIO(data), filename="a.jpg"), user)
+    await asyncio.gather(*uploader.tasks)
+    (tmp_path / "source").write_bytes(data)
+    digest = file_digest(tmp_path / "source")
+    assert sorted(path.name for path in (tmp_path / "avatars" / digest).iterdir()) == ["250.jpg", "64.jpg"]
+    async with session_maker() as db:
+        assert (await db.get(User, 1)).avatar == f"/media/avatars/{digest}/250.jpg"
+    assert list((tmp_path / "staging").iterdir()) == []
+    await uploader.stop()
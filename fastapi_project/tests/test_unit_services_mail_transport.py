@@ -0,0 +1,126 @@
+import socket
+from email.message import EmailMessage
+import aiosmtplib
+import pytest
+import pytest_asyncio
+from fastapi_mail import ConnectionConfig
+from fastapi_mail.errors import ConnectionErrors
+from fastapi_project.src.services.mail_transport import SMTPPool
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+
+class Recorder:
+    def __init__(self):
+        self.sessions = set()
+        self.recipients = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("rejected"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def mail_config(port, **overrides):
+    return ConnectionConfig(**{
+        "MAIL_USERNAME": "sender@example.com", "MAIL_PASSWORD": "", "MAIL_FROM": "sender@example.com",
+        "MAIL_PORT": port, "MAIL_SERVER": "127.0.0.1", "MAIL_FROM_NAME": "Contacts", "MAIL_STARTTLS": False,
+        "MAIL_SSL_TLS": False, "USE_CREDENTIALS": False, "VALIDATE_CERTS": False, **overrides,
+    })
+
+
+def message(recipient):
+    message = EmailMessage()
+    message["From"] = "sender@example.com"
+    message["To"] = recipient
+    message["Subject"] = "Hello"
+    message.set_content("Hello")
+    return message
+
+
+@pytest_asyncio.fixture
+async def smtp_server():
+    recorder = Recorder()
+    controller = controller_module.Controller(recorder, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller.port, recorder
+    controller.stop()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_reused_between_sends(smtp_server):
+    port, recorder = smtp_server
+    pool = SMTPPool(mail_config(port), size=2)
+    for i in range(5):
+        assert await pool.send([message(f"user{i}@example.com")]) == [None]
+    await pool.close()
+    assert len(recorder.recipients) == 5
+    assert len(recorder.sessions) == 1
+    stats = pool.stats()
+    assert (stats["connects"], stats["reuses"], stats["sent"], stats["messages_per_connect"]) == (1, 4, 5, 5.0)
+
+
+@pytest.mark.asyncio
+async def test_send_many_spreads_over_bounded_sessions(smtp_server):
+    port, recorder = smtp_server
+    pool = SMTPPool(mail_config(port), size=3, max_messages=4)
+    results = await pool.send_many([message(f"user{i}@example.com") for i in range(20)])
+    await pool.close()
+    assert results == [None] * 20
+    assert sorted(recorder.recipients) == sorted(f"user{i}@example.com" for i in range(20))
+    # 3 lanes of 7, 7 and 6 messages, rotated after every 4 messages.
+    assert pool.stats()["connects"] == 6
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_does_not_break_session(smtp_server):
+    port, recorder = smtp_server
+    pool = SMTPPool(mail_config(port))
+    first, rejected, last = await pool.send(
+        [message("a@example.com"), message("rejected@example.com"), message("b@example.com")]
+    )
+    await pool.close()
+    assert first is None and last is None
+    assert rejected is not None
+    assert recorder.recipients == ["a@example.com", "b@example.com"]
+    assert (pool.stats()["sent"], pool.stats()["failed"], pool.stats()["connects"]) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_server_raises_connection_error():
+    pool = SMTPPool(mail_config(free_port()))
+    with pytest.raises(ConnectionErrors):
+        await pool.send([message("a@example.com")])
+    assert isinstance((await pool.send_many([message("a@example.com")]))[0], ConnectionErrors)
+    assert await SMTPPool(mail_config(free_port(), SUPPRESS_SEND=1)).send([message("a@example.com")]) == [None]
+
+
+@pytest.mark.asyncio
+async def test_disconnected_idle_session_is_replaced(smtp_server):
+    port, recorder = smtp_server
+    pool = SMTPPool(mail_config(port))
+    assert await pool.send([message("a@example.com")]) == [None]
+    stale = pool._idle[0].smtp
+
+    async def disconnected(*args, **kwargs):
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    # The server dropped the connection while it was idle and the client has not noticed yet.
+    stale.send_message = disconnected
+    assert await pool.send([message("b@example.com"), message("c@example.com")]) == [None, None]
+    await pool.close()
+    assert recorder.recipients == ["a@example.com", "b@example.com", "c@example.com"]
+    assert (pool.stats()["connects"], pool.stats()["sent"], pool.stats()["failed"]) == (2, 3, 0)
+    assert not stale.is_connected
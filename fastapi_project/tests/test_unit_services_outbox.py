@@ -0,0 +1,114 @@
+import socket
+from email import message_from_bytes
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select
+from fastapi_project.src.database.models import EmailOutbox, User
+from fastapi_project.src.repository import outbox as repository_outbox
+from fastapi_project.src.services.outbox import OutboxWorker
+
+
+async def enqueue(session_maker, user_id, kind="confirm"):
+    async with session_maker() as db:
+        user = await db.get(User, user_id)
+        return await repository_outbox.enqueue_email(user, kind, "http://test/", db)
+
+
+async def outbox(session_maker):
+    async with session_maker() as db:
+        return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_deduplicates_pending_email_per_user_and_kind(session_maker):
+    assert await enqueue(session_maker, 1)
+    assert not await enqueue(session_maker, 1)
+    assert await enqueue(session_maker, 1, "reset")
+    assert await enqueue(session_maker, 2)
+    assert [(email.user_id, email.kind) for email in await outbox(session_maker)] == [(1, "confirm"), (1, "reset"), (2, "confirm")]
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_and_marks_emails_sent(session_maker):
+    await enqueue(session_maker, 1)
+    await enqueue(session_maker, 2)
+    send = AsyncMock()
+    worker = OutboxWorker(session_maker, send, concurrency=10)
+    assert await worker.run_once() == 2
+    assert await worker.run_once() == 0
+    assert sorted(call.args[0].email for call in send.await_args_list) == ["one@example.com", "two@example.com"]
+    assert [email.status for email in await outbox(session_maker)] == ["sent", "sent"]
+    # A sent email no longer blocks a new one of the same kind.
+    assert await enqueue(session_maker, 1)
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_with_backoff_then_gives_up(session_maker):
+    await enqueue(session_maker, 1)
+    worker = OutboxWorker(session_maker, AsyncMock(side_effect=OSError("connection refused")),
+                          max_attempts=2, backoff_base=30)
+    assert await worker.run_once() == 1
+    email, = await outbox(session_maker)
+    assert (email.status, email.attempts, email.last_error) == ("pending", 1, "OSError('connection refused')")
+    assert email.next_attempt_at - repository_outbox.utcnow() > timedelta(seconds=25)
+    assert await worker.run_once() == 0
+
+    async with session_maker() as db:
+        (await db.get(EmailOutbox, email.id)).next_attempt_at = repository_outbox.utcnow()
+        await db.commit()
+    assert await worker.run_once() == 1
+    email, = await outbox(session_maker)
+    assert (email.status, email.attempts) == ("failed", 2)
+    assert worker.stats() == {"sent": 0, "retried": 1, "failed": 1}
+    assert worker.backoff(10) == worker.backoff_max
+
+
+@pytest.mark.asyncio
+async def test_claim_is_a_lease(session_maker):
+    await enqueue(session_maker, 1)
+    async with session_maker() as db:
+        assert len(await repository_outbox.claim_emails(10, 0, db)) == 1
+        # The worker holding it never reported back; with the lease over it is due again.
+        reclaimed = await repository_outbox.claim_emails(10, 300, db)
+        assert [email.attempts for email in reclaimed] == [2]
+        assert await repository_outbox.claim_emails(10, 300, db) == []
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_worker_delivers_through_local_smtp_server(session_maker):
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    handlers = pytest.importorskip("aiosmtpd.handlers")
+    from fastapi_mail import ConnectionConfig
+    from fastapi_project.outbox_worker import send
+    from fastapi_project.src.services import email as email_service
+    from fastapi_project.src.services.mail_transport import SMTPPool
+
+    handler = handlers.Sink()
+    handler.handle_DATA = AsyncMock(return_value="250 OK")
+    port = free_port()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    conf = ConnectionConfig(
+        MAIL_USERNAME="sender@example.com", MAIL_PASSWORD="", MAIL_FROM="sender@example.com", MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1", MAIL_FROM_NAME="Contacts", MAIL_STARTTLS=False, MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False, VALIDATE_CERTS=False,
+    )
+    try:
+        await enqueue(session_maker, 1)
+        with patch.object(email_service, "mail_transport", SMTPPool(conf)):
+            assert await OutboxWorker(session_maker, send).run_once() == 1
+            await email_service.mail_transport.close()
+    finally:
+        controller.stop()
+    envelope = handler.handle_DATA.await_args.args[2]
+    assert envelope.rcpt_tos == ["one@example.com"]
+    body = b"".join(part.get_payload(decode=True) or b"" for part in message_from_bytes(envelope.content).walk())
+    assert b"http://test/api/auth/confirmed_email/" in body
+    assert [email.status for email in await outbox(session_maker)] == ["sent"]
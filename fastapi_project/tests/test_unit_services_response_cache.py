@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock
+from fastapi_project.src.services.response_cache import ResponseCache, params_digest
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.get = AsyncMock(side_effect=self._get)
+        self.set = AsyncMock(side_effect=self._set)
+
+    async def _get(self, key):
+        return self.data.get(key)
+
+    async def _set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+
+def loader(body=b"[]", headers=None):
+    return AsyncMock(return_value=(body, headers or {}))
+
+
+def test_params_digest_ignores_order_and_unset_values():
+    assert params_digest({"limit": 10, "q": None, "email": "a@b.c"}) == params_digest({"email": "a@b.c", "limit": 10})
+    assert params_digest({"limit": 10}) != params_digest({"limit": 20})
+
+
+@pytest.mark.asyncio
+async def test_serve_caches_body_and_headers():
+    cache = ResponseCache({"contacts": 30})
+    cache.start(FakeRedis())
+    load = loader(b'[{"id":1}]', {"X-Next-Cursor": "abc"})
+    for _ in range(3):
+        body, headers = await cache.serve("contacts", 1, {"limit": 10}, load)
+        assert body == b'[{"id":1}]'
+        assert headers["X-Next-Cursor"] == "abc"
+    load.assert_awaited_once()
+    assert cache.stats() == {"contacts": {"hits": 2, "misses": 1, "hit_ratio": 2 / 3}}
+
+
+@pytest.mark.asyncio
+async def test_bump_makes_entries_of_one_user_unreachable():
+    cache = ResponseCache({"contacts": 30})
+    cache.start(FakeRedis())
+    first, other = loader(b"[1]"), loader(b"[2]")
+    await cache.serve("contacts", 1, {}, first)
+    await cache.serve("contacts", 2, {}, other)
+    await cache.bump(1)
+    await cache.serve("contacts", 1, {}, first)
+    await cache.serve("contacts", 2, {}, other)
+    assert first.await_count == 2
+    assert other.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_route_and_missing_client_bypass_cache():
+    load = loader()
+    cache = ResponseCache({"contacts": 30, "birthday": 0})
+    await cache.serve("contacts", 1, {}, load)
+    cache.start(FakeRedis())
+    await cache.serve("birthday", 1, {}, load)
+    await cache.serve("birthday", 1, {}, load)
+    assert load.await_count == 3
+    assert not [key for key in cache.client.data if key.startswith("contacts:response:")]
+    await ResponseCache({}).bump(1)
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_skips_loading_until_contacts_change():
+    cache = ResponseCache({"contacts": 30})
+    cache.start(FakeRedis())
+    load = loader(b"[1]")
+    body, headers = await cache.serve("contacts", 1, {"limit": 10}, load)
+    etag = headers["ETag"]
+    assert await cache.serve("contacts", 1, {"limit": 10}, load, etag) == (None, {"ETag": etag})
+    assert await cache.serve("contacts", 1, {"limit": 20}, load, etag) != (None, {"ETag": etag})
+    await cache.bump(1)
+    body, headers = await cache.serve("contacts", 1, {"limit": 10}, load, etag)
+    assert body == b"[1]" and headers["ETag"] != etag
+    assert load.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_etag_falls_back_to_body_digest_without_redis():
+    cache = ResponseCache({"contacts": 30})
+    body, headers = await cache.serve("contacts", 1, {}, loader(b"[1]"))
+    assert await cache.serve("contacts", 1, {}, loader(b"[1]"), f'W/{headers["ETag"]}') == (None, {"ETag": headers["ETag"]})
+    assert (await cache.serve("contacts", 1, {}, loader(b"[2]"), headers["ETag"]))[0] == b"[2]"
@@ -0,0 +1,36 @@
+import pytest
+from fastapi_project.src.services.templating import TEMPLATE_DIR, TemplateService
+
+
+@pytest.fixture
+def service(tmp_path):
+    (tmp_path / "plain.html").write_text("<p>Hi {{username}}</p><a href=\"{{host}}confirm/{{token}}\">x</a>")
+    (tmp_path / "branching.html").write_text("{% if username %}Hi {{username|upper}}{% else %}Hi{% endif %}")
+    return TemplateService(tmp_path, str(tmp_path / "bytecode"))
+
+
+def test_prerendered_output_matches_full_render_and_escapes(service):
+    values = {"host": "http://test/", "username": "<b>Bob & Co</b>", "token": "abc"}
+    assert service.render_fields("plain.html", **values) == service.render("plain.html", **values)
+    assert "&lt;b&gt;Bob &amp; Co&lt;/b&gt;" in service.render_fields("plain.html", **values)
+    assert service.prerendered("plain.html", ("host", "token", "username")).static[0] == "<p>Hi "
+
+
+def test_template_that_uses_its_variables_is_rendered_in_full(service):
+    assert service.prerendered("branching.html", ("username",)) is None
+    assert service.render_fields("branching.html", username="bob") == "Hi BOB"
+    assert service.render_fields("branching.html", username="") == "Hi"
+
+
+def test_preload_writes_bytecode_cache(service, tmp_path):
+    service.preload()
+    assert len(list((tmp_path / "bytecode").iterdir())) == 2
+    # A second process reuses the compiled code.
+    assert TemplateService(tmp_path, str(tmp_path / "bytecode")).render("plain.html", username="a", host="", token="") \
+        == service.render("plain.html", username="a", host="", token="")
+
+
+@pytest.mark.parametrize("name", ["email_template.html", "email_rp_template.html"])
+def test_email_templates_can_be_prerendered(name):
+    service = TemplateService(TEMPLATE_DIR)
+    assert service.prerendered(name, ("host", "token", "username")) is not None
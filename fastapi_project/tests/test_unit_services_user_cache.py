@@ -0,0 +1,123 @@
+import asyncio
+import pickle
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi_project.src.database.models import User
+from fastapi_project.src.services.cache import LRUCache
+from fastapi_project.src.services.user_cache import (
+    CachedUser,
+    UserCache,
+    INVALIDATION_CHANNEL,
+    serialize_user,
+    deserialize_user,
+)
+
+
+@pytest.fixture
+def user():
+    return User(id=1, username="test", email="test@example.com", password="hashed", avatar="url", confirmed=True, version=1)
+
+
+def test_serialize_user_round_trip(user):
+    data = serialize_user(user)
+    assert b"hashed" not in data
+    assert deserialize_user(data) == CachedUser(1, "test", "test@example.com", "url", True, 1)
+
+
+def test_deserialize_user_rejects_unknown_records():
+    assert deserialize_user(b'[1,1,"test","test@example.com",null,true]') is None
+    assert deserialize_user(b'[0,1,"test","test@example.com",null,true,1]') is None
+    assert deserialize_user(pickle.dumps({"email": "test@example.com"})) is None
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 1, "evictions": 1}
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 0, "misses": 1, "evictions": 1}
+
+
+@pytest.mark.asyncio
+async def test_user_cache_falls_back_to_redis(user):
+    cache = UserCache(local_size=10, local_ttl=60, redis_ttl=900)
+    cache.client = AsyncMock()
+    cache.client.get.return_value = serialize_user(user)
+    assert await cache.get("test@example.com") == CachedUser(1, "test", "test@example.com", "url", True, 1)
+    assert await cache.get("test@example.com") == CachedUser(1, "test", "test@example.com", "url", True, 1)
+    cache.client.get.assert_awaited_once_with("test@example.com")
+    assert cache.stats()["local"]["hits"] == 1
+    assert cache.stats()["redis"] == {"hits": 1, "misses": 0, "evictions": 0, "resubscribes": 0}
+
+
+@pytest.mark.asyncio
+async def test_user_cache_set_writes_both_tiers(user):
+    cache = UserCache(local_size=10, local_ttl=60, redis_ttl=900)
+    cache.client = AsyncMock()
+    await cache.set(user, 300)
+    cache.client.set.assert_awaited_once_with("test@example.com", serialize_user(user), ex=300)
+    assert cache.local.get("test@example.com") == CachedUser(1, "test", "test@example.com", "url", True, 1)
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidate_publishes(user):
+    cache = UserCache(local_size=10, local_ttl=60, redis_ttl=900)
+    await cache.set(user)
+    cache.client = AsyncMock()
+    cache.client.delete.return_value = 1
+    await cache.invalidate("test@example.com")
+    assert cache.local.get("test@example.com") is None
+    cache.client.delete.assert_awaited_once_with("test@example.com")
+    cache.client.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, "test@example.com")
+    assert cache.stats()["redis"]["evictions"] == 1
+
+
+class DroppingPubSub:
+    """
+    Delivers its messages, then fails like a dropped connection or waits forever.
+    """
+
+    def __init__(self, messages, drop):
+        self.messages = messages
+        self.drop = drop
+        self.subscribe = AsyncMock()
+        self.aclose = AsyncMock()
+
+    async def listen(self):
+        for message in self.messages:
+            yield {"type": "message", "data": message}
+        if self.drop:
+            raise ConnectionError("Connection closed by server.")
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_user_cache_resubscribes_after_connection_loss(user):
+    cache = UserCache(local_size=10, local_ttl=60, redis_ttl=900, resubscribe_base=0)
+    first = DroppingPubSub([b"a@example.com"], drop=True)
+    second = DroppingPubSub([b"b@example.com"], drop=False)
+    client = MagicMock()
+    client.pubsub.side_effect = [first, second]
+    for email in ("a@example.com", "b@example.com", "c@example.com"):
+        cache.local.set(email, email)
+    await cache.start(client)
+    while not second.subscribe.await_count:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    second.subscribe.assert_awaited_once_with(INVALIDATION_CHANNEL)
+    first.aclose.assert_awaited_once()
+    # Invalidations missed while disconnected are covered by clearing the local tier.
+    assert cache.local.stats()["size"] == 0
+    assert cache.stats()["redis"]["resubscribes"] == 1
+    await cache.stop()
+    second.aclose.assert_awaited_once()